@@ -0,0 +1,156 @@
+# Async versions of the queries used by the web front end from OSINTdatabase and OSINTuser, for use with an async connection from psycopg 3 (psycopg.AsyncConnection), which uses the same query format as psycopg2. The functions have the same arguments and return values as their synchronous counterparts, but has to be awaited
+
+# The articles are returned as compact records instead of dictionaries
+from OSINTmodules.OSINTrecords import ArticleRecord
+
+# Function for making sure the numbers inserted directly in the queries actually are intengers
+def verifyInt(number):
+    if type(number) != int:
+        raise Exception("An internal number given when trying to access the database appears to not be a number but instead: \"{}\"".format(number))
+
+async def requestOGTagsFromDB(connection, tableName, profileList, limit, idList=[]):
+    verifyInt(limit)
+
+    # Which collumns to extract data from
+    collumns = "id, title, description, url, image_url, author, publish_date, profile"
+
+    async with connection.cursor() as cur:
+        if idList != []:
+            await cur.execute("SELECT {} FROM {} WHERE scraped=true AND id=ANY(%s) AND profile=ANY(%s) ORDER BY publish_date DESC;".format(collumns, tableName), (idList, profileList))
+        else:
+            await cur.execute("SELECT {} FROM {} WHERE scraped=true AND profile=ANY(%s) ORDER BY publish_date DESC LIMIT {};".format(collumns, tableName, limit), (profileList,))
+        queryResults = await cur.fetchall()
+
+    return [ArticleRecord(*result) for result in queryResults]
+
+async def returnArticleFilePathById(connection, articleId, tableName):
+    verifyInt(articleId)
+
+    async with connection.cursor() as cur:
+        await cur.execute("SELECT file_path FROM {} WHERE id = %s".format(tableName), (articleId,))
+        results = await cur.fetchall()
+
+    if results == []:
+        return ""
+    else:
+        return results[0][0]
+
+async def checkIfArticleMarked(connection, userTableName, IDList, username):
+    async with connection.cursor() as cur:
+        await cur.execute("SELECT selected_article_ids FROM {} WHERE username = %s".format(userTableName), (username,))
+        DBResults = await cur.fetchall()
+
+    markedArticles = DBResults[0][0]
+
+    if markedArticles == None:
+        return [False] * len(IDList)
+
+    return [ ID in markedArticles for ID in IDList ]
+
+# Function for getting the feed of articles along with whether each of them has been marked by [username], where both queries are sent to the DB together in a pipeline so only one round trip is needed. Returns the articles in the same format as requestOGTagsFromDB and the list of markings in the same format as checkIfArticleMarked
+async def requestFeedWithMarks(connection, articleTableName, userTableName, profileList, limit, username):
+    verifyInt(limit)
+
+    collumns = "id, title, description, url, image_url, author, publish_date, profile"
+
+    async with connection.pipeline():
+        async with connection.cursor() as articleCur, connection.cursor() as userCur:
+            await articleCur.execute("SELECT {} FROM {} WHERE scraped=true AND profile=ANY(%s) ORDER BY publish_date DESC LIMIT {};".format(collumns, articleTableName, limit), (profileList,))
+            await userCur.execute("SELECT selected_article_ids FROM {} WHERE username = %s".format(userTableName), (username,))
+            articleResults = await articleCur.fetchall()
+            userResults = await userCur.fetchall()
+
+    articles = [ArticleRecord(*result) for result in articleResults]
+
+    markedArticles = userResults[0][0] if userResults != [] else None
+    if markedArticles == None:
+        return articles, [False] * len(articles)
+
+    return articles, [ article['id'] in markedArticles for article in articles ]
+
+# Will mark an article as of interrest or remove an article as of interrest for the [osinter_user] based on whether mark is true or false
+async def markArticle(connection, articleTableName, userTableName, osinter_user, articleID, mark):
+    async with connection.cursor() as cur:
+        # Verifying that the user and the article exists, in one query
+        await cur.execute("SELECT EXISTS(SELECT 1 FROM {} WHERE username = %s), EXISTS(SELECT 1 FROM {} WHERE id = %s);".format(userTableName, articleTableName), (osinter_user, articleID))
+        userExists, articleExists = (await cur.fetchall())[0]
+
+        if not userExists:
+            return "User does not seem to exist"
+        elif not articleExists:
+            return "Article does not seem to exist"
+
+        if mark:
+            # Combines the array from the DB with the new ID, and takes all the uniqe entries from that so that duplicates are avoided
+            await cur.execute("UPDATE {} SET selected_article_ids = ARRAY(SELECT DISTINCT UNNEST(COALESCE(selected_article_ids, '{{}}') || %s::bigint)) WHERE username = %s;".format(userTableName), (articleID, osinter_user))
+        else:
+            await cur.execute("UPDATE {} SET selected_article_ids = array_remove(selected_article_ids, %s::bigint) WHERE username = %s;".format(userTableName), (articleID, osinter_user))
+
+    await connection.commit()
+    return True
+
+async def getUsernameFromID(connection, userTableName, userID):
+    async with connection.cursor() as cur:
+        await cur.execute("SELECT username FROM {} WHERE id = %s;".format(userTableName), (userID,))
+        username = await cur.fetchall()
+
+    if username == []:
+        return False
+    else:
+        return username[0][0]
+
+# Same as OSINTuser.getMarkedArticlePaths, but finds all the paths in one query instead of one for each article
+async def getMarkedArticlePaths(connection, username, userTableName, articleTableName):
+    async with connection.cursor() as cur:
+        await cur.execute("SELECT a.id, a.file_path FROM {} u, {} a WHERE u.username = %s AND a.id = ANY(u.selected_article_ids);".format(userTableName, articleTableName), (username,))
+        filePaths = dict(await cur.fetchall())
+
+        await cur.execute("SELECT selected_article_ids FROM {} WHERE username = %s".format(userTableName), (username,))
+        markedArticles = (await cur.fetchall())[0][0]
+
+    if markedArticles == None:
+        return []
+
+    # Keeping the same order as the marked articles, and an empty path for articles that doesn't exist, like returnArticleFilePathById
+    return [filePaths.get(articleID, "") for articleID in markedArticles]
+
+# Async version of the parts of OSINTuser.User that reads from the DB. Password verification is left to OSINTuser, as hashing is CPU bound and won't benefit from being async
+class AsyncUser():
+    def __init__(self, DBConnection, userTableName, username):
+        self.DBConnection = DBConnection
+        self.userTableName = userTableName
+        self.username = username
+
+    async def checkIfUserExists(self):
+        async with self.DBConnection.cursor() as cur:
+            await cur.execute("SELECT EXISTS(SELECT 1 FROM {} WHERE username = %s);".format(self.userTableName), (self.username,))
+            return (await cur.fetchall())[0][0]
+
+    async def getPasswordHash(self):
+        async with self.DBConnection.cursor() as cur:
+            await cur.execute("SELECT password_hash FROM {} WHERE username=%s;".format(self.userTableName), (self.username,))
+            results = await cur.fetchall()
+        return results[0][0] if results != [] else False
+
+    async def getMarkedArticles(self):
+        async with self.DBConnection.cursor() as cur:
+            await cur.execute("SELECT selected_article_ids FROM {} WHERE username=%s;".format(self.userTableName), (self.username,))
+            results = await cur.fetchall()
+        if results != [] and results[0][0]:
+            return results[0][0]
+        else:
+            return []
+
+    async def get_id(self):
+        async with self.DBConnection.cursor() as cur:
+            await cur.execute("SELECT id FROM {} WHERE username=%s;".format(self.userTableName), (self.username,))
+            results = await cur.fetchall()
+        return results[0][0] if results != [] else False
+
+    # Methods needed by the flask_login plugin
+    def is_active(self):
+        return True
+    def is_authenticated(self):
+        return True
+    def is_anonymous(self):
+        return False
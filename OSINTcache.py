@@ -0,0 +1,205 @@
+# Used for keeping track of the order the entries in the cache was used in
+from collections import OrderedDict
+
+# Used for making the cache safe to use from multiple threads
+import threading
+
+import time
+
+import os
+
+# Used for handling relative paths
+from pathlib import Path
+
+# Used for storing the entries in the shared cache
+import pickle
+import hashlib
+import tempfile
+
+# Read-through cache for the queries and files used by the front end. Everything that depends on the articles in the DB is cached with the current "generation" as part of the key, and the generation is bumped every time new articles are written to the DB, which means that all the old entries will simply stop being used and eventually be pushed out of the cache. The generation is stored both in this process, and optionally as the modification time of a file, so that a scraper running in another process can invalidate the cache for the front end
+
+# In-memory cache where the least recently used entries are removed when it's full, and where entries expire after ttl seconds
+class LRUCache():
+    def __init__(self, maxSize=1024, ttl=300):
+        self.maxSize = maxSize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    # Returns the value stored for key, or None if it isn't in the cache or has expired
+    def get(self, key):
+        with self.lock:
+            if key not in self.entries:
+                return None
+            expiryTime, value = self.entries[key]
+            if expiryTime < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxSize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+# Cache stored as files in a local folder, so it can be shared between multiple processes (like the workers of the web server) on the same machine. Has the same methods as LRUCache, so it can be used in it's place with setCacheStore. Expired entries are removed when read, and the folder is pruned every pruneInterval writes, so it never holds more than maxEntries entries (plus the ones written since the last pruning)
+class SharedFileCache():
+    def __init__(self, cacheFolder, ttl=300, maxEntries=4096, pruneInterval=100):
+        self.cacheFolder = Path(cacheFolder)
+        self.ttl = ttl
+        self.maxEntries = maxEntries
+        self.pruneInterval = pruneInterval
+        self.writesSincePrune = 0
+        self.lock = threading.Lock()
+        os.makedirs(self.cacheFolder, mode=0o750, exist_ok=True)
+
+    def pathForKey(self, key):
+        return self.cacheFolder / (hashlib.sha256(repr(key).encode("utf-8")).hexdigest() + ".cache")
+
+    def get(self, key):
+        cachePath = self.pathForKey(key)
+        try:
+            with open(cachePath, "rb") as cacheFile:
+                storedKey, expiryTime, value = pickle.load(cacheFile)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+        if expiryTime < time.time():
+            try:
+                cachePath.unlink()
+            except OSError:
+                pass
+            return None
+
+        if storedKey != key:
+            return None
+
+        return value
+
+    def set(self, key, value):
+        # Written to a temporary file and then renamed, so other processes will never read a partially written entry
+        fileDescriptor, tempPath = tempfile.mkstemp(dir=self.cacheFolder, suffix=".tmp")
+        with os.fdopen(fileDescriptor, "wb") as tempFile:
+            pickle.dump((key, time.time() + self.ttl, value), tempFile)
+        os.replace(tempPath, self.pathForKey(key))
+
+        with self.lock:
+            self.writesSincePrune += 1
+            shouldPrune = self.writesSincePrune >= self.pruneInterval
+            if shouldPrune:
+                self.writesSincePrune = 0
+
+        if shouldPrune:
+            self.prune()
+
+    # Removes the expired entries (using the modification time of the files, as they're written when the entry is set), and after that the oldest entries until there's at most maxEntries left. Temporary files left behind by processes that crashed while writing are removed too
+    def prune(self):
+        expiryTime = time.time() - self.ttl
+        cacheFiles = []
+        for cacheFile in self.cacheFolder.iterdir():
+            try:
+                modificationTime = cacheFile.stat().st_mtime
+                if modificationTime < expiryTime:
+                    cacheFile.unlink()
+                elif cacheFile.suffix == ".cache":
+                    cacheFiles.append((modificationTime, cacheFile))
+            except OSError:
+                # Another process might have removed or replaced the file in the meantime
+                pass
+
+        if len(cacheFiles) > self.maxEntries:
+            cacheFiles.sort()
+            for modificationTime, cacheFile in cacheFiles[:len(cacheFiles) - self.maxEntries]:
+                try:
+                    cacheFile.unlink()
+                except OSError:
+                    pass
+
+    def clear(self):
+        for cacheFile in self.cacheFolder.glob("*.cache"):
+            try:
+                cacheFile.unlink()
+            except OSError:
+                pass
+
+cacheStore = LRUCache()
+
+# Used for replacing the default in-memory cache, with for example a SharedFileCache
+def setCacheStore(store):
+    global cacheStore
+    cacheStore = store
+
+# The generation of the articles in this process, and the file used for sharing it with other processes (if set)
+localGeneration = 0
+generationFile = None
+
+# Set a file that will be touched whenever new articles are written, and checked when reading from the cache. Should be set to the same file in both the scraper and the front end
+def setGenerationFile(filePath):
+    global generationFile
+    generationFile = Path(filePath)
+
+def currentGeneration():
+    if generationFile != None:
+        try:
+            return (localGeneration, os.stat(generationFile).st_mtime_ns)
+        except OSError:
+            return (localGeneration, 0)
+    return (localGeneration, 0)
+
+# Called whenever new articles (or changes to them) has been commited to the DB, so the cached queries won't be used again
+def invalidateArticleCache():
+    global localGeneration
+    localGeneration += 1
+    if generationFile != None:
+        generationFile.touch()
+        # Making sure the modification time changes even on filesystems with low timestamp resolution
+        os.utime(generationFile, ns=(time.time_ns(), max(time.time_ns(), os.stat(generationFile).st_mtime_ns + 1)))
+
+# Function for looking key up in the cache, and calling function with args and storing the result if it isn't there
+def readThrough(key, function, *args):
+    value = cacheStore.get(key)
+    if value == None:
+        value = function(*args)
+        cacheStore.set(key, value)
+    return value
+
+# Cached version of OSINTdatabase.requestOGTagsFromDB. The returned list is shared with other callers, and therefore shouldn't be modified
+def cachedRequestOGTagsFromDB(connection, tableName, profileList, limit, idList=[]):
+    from OSINTmodules.OSINTdatabase import requestOGTagsFromDB
+    key = ("requestOGTagsFromDB", tableName, tuple(profileList), limit, tuple(idList), currentGeneration())
+    return readThrough(key, requestOGTagsFromDB, connection, tableName, profileList, limit, idList)
+
+# Cached version of OSINTprofiles.collectWebsiteDetails
+def cachedCollectWebsiteDetails(connection, tableName):
+    from OSINTmodules.OSINTprofiles import collectWebsiteDetails
+    key = ("collectWebsiteDetails", tableName, currentGeneration())
+    return readThrough(key, collectWebsiteDetails, connection, tableName)
+
+# Cached version of OSINTdatabase.returnArticleFilePathById
+def cachedReturnArticleFilePathById(connection, articleId, tableName):
+    from OSINTmodules.OSINTdatabase import returnArticleFilePathById
+    key = ("returnArticleFilePathById", articleId, tableName, currentGeneration())
+    return readThrough(key, returnArticleFilePathById, connection, articleId, tableName)
+
+# Function for reading the article at filePath (as stored in the DB) and optionally rendering it using the function given as render (like a markdown to html converter). The result is cached using the modification time of the file, so a changed file will always be read again. When rendering, renderName has to be given as a name (and version) unique to the renderer, like "markdown-html-v1", as the rendered articles are cached under that name, and the cache might be shared with other processes. The name should be changed whenever the output of the renderer changes
+def readArticleCached(filePath, articleRoot="./articles/", render=None, renderName=None):
+    from OSINTmodules.OSINTfiles import readArticleFile, articleFilePath
+
+    if render != None and renderName == None:
+        raise Exception("A renderName identifying the renderer has to be given when rendering the article")
+
+    # The bodies referred to by header files are never changed once written, so only the modification time of the file itself is needed
+    modificationTime = os.stat(articleFilePath(filePath, articleRoot)).st_mtime_ns
+    key = ("readArticle", articleRoot, filePath, modificationTime, renderName)
+
+    if render == None:
+        return readThrough(key, readArticleFile, filePath, articleRoot)
+    else:
+        return readThrough(key, lambda: render(readArticleFile(filePath, articleRoot)))
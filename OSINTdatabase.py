@@ -1,7 +1,27 @@
 import secrets
-import psycopg2
 from datetime import datetime
 
+# Used for detecting articles that are near duplicates of already stored ones
+from OSINTmodules.OSINTtext import simHash, FingerprintIndex
+
+# Used for letting the front end cache know when new articles has been written
+from OSINTmodules.OSINTcache import invalidateArticleCache
+
+# The articles read from the DB are returned as compact records instead of dictionaries
+from OSINTmodules.OSINTrecords import ArticleRecord, SearchResultRecord
+
+# Used for processing streams of articles in batches
+from OSINTmodules.OSINTmisc import batchIterator
+
+# Columns that have been added to the article table after the first version of it. They're part of the table when it's created, but also has to be added to existing tables, as CREATE TABLE won't touch those
+addedArticleColumns = [
+        "og_fingerprint BIGINT DEFAULT NULL",
+        "content_fingerprint BIGINT DEFAULT NULL",
+        "duplicate_of BIGINT DEFAULT NULL",
+        "search_vector TSVECTOR DEFAULT NULL",
+        "tags TEXT[] DEFAULT NULL"
+        ]
+
 def initiateArticleTable(connection):
     articleTableContentList = [
             "id BIGSERIAL NOT NULL PRIMARY KEY",
@@ -15,9 +35,22 @@ def initiateArticleTable(connection):
             "scraped BOOL NOT NULL",
             "inserted_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP",
             "file_path VARCHAR(150) DEFAULT NULL"
-            ]
+            ] + addedArticleColumns
+
+    tableCreated = createTable(connection, "articles", articleTableContentList)
+
+    with connection.cursor() as cur:
+        for column in addedArticleColumns:
+            cur.execute("ALTER TABLE articles ADD COLUMN IF NOT EXISTS " + column + ";")
+
+        # Creating the index used for full text search of the articles
+        cur.execute("CREATE INDEX IF NOT EXISTS articles_search_vector_idx ON articles USING GIN (search_vector);")
+        # And the indexes used for finding articles by tag and limiting tag queries to a time window
+        cur.execute("CREATE INDEX IF NOT EXISTS articles_tags_idx ON articles USING GIN (tags);")
+        cur.execute("CREATE INDEX IF NOT EXISTS articles_publish_date_idx ON articles (publish_date);")
+    connection.commit()
 
-    return createTable(connection, "articles", articleTableContentList)
+    return tableCreated
 
 def initiateUserTable(connection):
     userTableContentList = [
@@ -47,7 +80,8 @@ def initiateAdmin(connection):
     # Make sure to close the old connection
     connection.close()
 
-    # Switching the connection from the prior superuser to the newly created one
+    # Switching the connection from the prior superuser to the newly created one. Psycopg2 is only imported here, as the connections are otherwise created by the code using this module
+    import psycopg2
     connection = psycopg2.connect("dbname={} user={} password={}".format(dbName, adminUsername, adminPassword))
 
     return adminPassword, connection
@@ -191,8 +225,14 @@ def checkIfArticleMarked(connection, userTableName, IDList, username):
 
         return IDMarkings
 
-# Function for writting OG tags to database
-def writeOGTagsToDB(connection, OGTags, tableName):
+# The text search configuration used for the full text search of the articles
+searchConfig = "english"
+
+# The SQL expression used for generating the search vector of an article, where the title is weighted the highest, then the tags and description and lastly the text of the article itself. Takes the title, description, tags and clear text as parameters in that order
+searchVectorExpression = "setweight(to_tsvector('{0}', coalesce(%s, '')), 'A') || setweight(to_tsvector('{0}', coalesce(%s, '')), 'B') || setweight(to_tsvector('{0}', coalesce(%s, '')), 'B') || setweight(to_tsvector('{0}', coalesce(%s, '')), 'D')".format(searchConfig)
+
+# Function for writting OG tags to database. If a FingerprintIndex (normally from loadFingerprintIndex with the og_fingerprint collumn) is given, articles where the title and description is a near duplicate of an already stored article will be stored as a duplicate of that article, and won't be returned for scraping
+def writeOGTagsToDB(connection, OGTags, tableName, fingerprintIndex=None):
     # Making sure the tablename is in all lowercase
     tableName = tableName.lower()
     # List to hold all the urls along with the profile names off the articles that haven't been scraped and saved in the database before so the whole article can be scraped
@@ -205,12 +245,24 @@ def writeOGTagsToDB(connection, OGTags, tableName):
                 # Checking if the article is already stored in the database using the URL as that is probably not going to change and is uniqe
                 cur.execute("SELECT exists (SELECT 1 FROM {} WHERE url = %s);".format(tableName), (tags['url'],))
                 if cur.fetchall()[0][0] == False:
-                    # Adding the url to list of new articles since it was not found in the database
-                    newUrls[-1].append(tags['url'])
-                    insertQuery = "INSERT INTO {} (title, description, url, image_url, author, publish_date, profile, scraped, inserted_at) VALUES (%s, %s, %s, %s, %s, %s, %s, false, NOW());".format(tableName)
-                    insertParameters = (tags['title'][:150], tags['description'][:350], tags['url'], tags['image'], tags['author'], tags['publishDate'] if tags['publishDate'] != None else datetime.now(), newsSite)
+                    OGFingerprint = None
+                    duplicateOf = None
+                    if fingerprintIndex != None:
+                        OGFingerprint = simHash(tags['title'] + " " + tags['description'])
+                        duplicateOf = fingerprintIndex.findNearDuplicate(OGFingerprint)
+
+                    insertQuery = "INSERT INTO {} (title, description, url, image_url, author, publish_date, profile, scraped, inserted_at, og_fingerprint, duplicate_of, search_vector) VALUES (%s, %s, %s, %s, %s, %s, %s, false, NOW(), %s, %s, {}) RETURNING id;".format(tableName, searchVectorExpression)
+                    insertParameters = (tags['title'][:150], tags['description'][:350], tags['url'], tags['image'], tags['author'], tags['publishDate'] if tags['publishDate'] != None else datetime.now(), newsSite, OGFingerprint, duplicateOf, tags['title'], tags['description'], None, None)
                     cur.execute(insertQuery, insertParameters)
+
+                    # Duplicates are stored so the url won't be collected again, but they shouldn't be scraped
+                    if duplicateOf == None:
+                        # Adding the url to list of new articles since it was not found in the database
+                        newUrls[-1].append(tags['url'])
+                        if fingerprintIndex != None:
+                            fingerprintIndex.add(cur.fetchall()[0][0], OGFingerprint)
     connection.commit()
+    invalidateArticleCache()
     # Return the list of urls not already in the database so they can be scraped
     return newUrls
 
@@ -235,9 +287,9 @@ def requestOGTagsFromDB(connection, tableName, profileList, limit, idList=[]):
             cur.execute("SELECT {} FROM {} WHERE scraped=true AND profile=ANY(%s) ORDER BY publish_date DESC LIMIT {};".format(collumns, tableName, limit), (profileList,))
         queryResults = cur.fetchall()
 
-        # Adding them to the final OG tag collection
+        # Adding them to the final OG tag collection as records, which can be converted to dictionaries with OSINTrecords.recordsAsDicts if needed
         for result in queryResults:
-            OGTagCollection.append({descriptor:value for (descriptor,value) in zip(collumns.split(", "), result)})
+            OGTagCollection.append(ArticleRecord(*result))
     return OGTagCollection
 
 def findUnscrapedArticles(connection, tableName, profileList):
@@ -248,8 +300,8 @@ def findUnscrapedArticles(connection, tableName, profileList):
         for profile in profileList:
             # Create a new list inside the "master" list with the first entry being the profile
             articleCollection.append([profile])
-            # Finding all articles for that specific profile that hasn't yet been marked as scraped
-            cur.execute("SELECT * FROM {} WHERE profile=%s AND scraped=false".format(tableName), (profile,))
+            # Finding all articles for that specific profile that hasn't yet been marked as scraped, and isn't a duplicate of another article
+            cur.execute("SELECT * FROM {} WHERE profile=%s AND scraped=false AND duplicate_of IS NULL".format(tableName), (profile,))
             queryResults = cur.fetchall()
 
             # Adding the results one by one to the latest added list in the "master" list which is the one for the current profile
@@ -284,13 +336,44 @@ def requestProfileListFromDB(connection, tableName):
         profiles = [item for element in cur.fetchall() for item in element]
         return profiles
 
-# Currently, the articles are inserted in the DB as OGTags and then the full article is scraped. To make sure that one does not end up with articles that are in the DB but not scraped in full, the articles will be marked as scraped in the DB using this function when they have actually been scraped
-def markAsScraped(connection, URL, filePath, tableName):
+# Currently, the articles are inserted in the DB as OGTags and then the full article is scraped. To make sure that one does not end up with articles that are in the DB but not scraped in full, the articles will be marked as scraped in the DB using this function when they have actually been scraped. The fingerprint of the clear text of the article (from OSINTtext.simHash) can be stored too, so later articles can be checked against it, and if the clear text and tags are given they will be added to the search vector used for full text search. The tags (from OSINTtext.generateTags) is also stored, so the articles can be found by tag. Returns the ID of the article
+def markAsScraped(connection, URL, filePath, tableName, contentFingerprint=None, clearText=None, tags=[]):
+    with connection.cursor() as cur:
+        # The full filepath of the file (which is [profile]/[filename] will also be noted, so it's easier to find when the front ends needs to render the MD files. A content fingerprint that is already stored is kept if none is given
+        if clearText != None or tags != []:
+            # The search vector is generated from scratch, with the title and description that is already stored in the DB
+            cur.execute("UPDATE {} SET scraped = true, file_path = %s, content_fingerprint = COALESCE(%s, content_fingerprint), tags = %s, search_vector = {} WHERE url = %s RETURNING id;".format(tableName, searchVectorExpression.replace("%s", "title", 1).replace("%s", "description", 1)), (filePath, contentFingerprint, list(tags), " ".join(tags), clearText, URL))
+        else:
+            cur.execute("UPDATE {} SET scraped = true, file_path = %s, content_fingerprint = COALESCE(%s, content_fingerprint) WHERE url = %s RETURNING id;".format(tableName), (filePath, contentFingerprint, URL))
+        results = cur.fetchall()
+        connection.commit()
+    invalidateArticleCache()
+
+    if results == []:
+        return None
+    else:
+        return results[0][0]
+
+# Used for marking an article that has turned out to be a near duplicate of the article with the ID duplicateOfID after it's content has been scraped, so that it won't be scraped again or show up in the feed
+def markAsDuplicate(connection, URL, duplicateOfID, tableName):
     with connection.cursor() as cur:
-        # The full filepath of the file (which is [profile]/[filename] will also be noted, so it's easier to find when the front ends needs to render the MD files
-        cur.execute("UPDATE {} SET scraped = true, file_path = %s WHERE url = %s;".format(tableName), (filePath, URL))
+        cur.execute("UPDATE {} SET duplicate_of = %s WHERE url = %s;".format(tableName), (duplicateOfID, URL))
         connection.commit()
 
+# Function for creating an index of the fingerprints stored in [collumn] (either og_fingerprint or content_fingerprint) for the articles inserted within the last maxAgeDays days, which can be used for detecting near duplicates of these articles
+def loadFingerprintIndex(connection, tableName, collumn, maxAgeDays=7, maxDistance=5):
+    if collumn not in ["og_fingerprint", "content_fingerprint"]:
+        raise Exception("The collumn \"{}\" doesn't contain fingerprints".format(collumn))
+
+    fingerprintIndex = FingerprintIndex(maxDistance)
+
+    with connection.cursor() as cur:
+        cur.execute("SELECT id, {0} FROM {1} WHERE {0} IS NOT NULL AND duplicate_of IS NULL AND inserted_at > NOW() - %s * INTERVAL '1 day';".format(collumn, tableName), (maxAgeDays,))
+        for articleID, fingerprint in cur.fetchall():
+            fingerprintIndex.add(articleID, fingerprint)
+
+    return fingerprintIndex
+
 # Simply find the filepath of a given article with articleId. Used by front end when rendering MD files
 def returnArticleFilePathById(connection, articleId, tableName):
     # Making sure the id given is actually an intenger
@@ -305,3 +388,128 @@ def returnArticleFilePathById(connection, articleId, tableName):
             return ""
         else:
             return results[0][0]
+
+# Function for searching the scraped articles using the full text search. Uses the same search syntax as most search engines (quotes for phrases, "or" and "-" for excluding words), and returns the articles in the same format as requestOGTagsFromDB with the best matches first, along with a rank for each of them. Use limit and offset for pagination
+def searchArticles(connection, tableName, searchQuery, profileList=[], limit=20, offset=0):
+
+    # Making sure the limit and offset given is actually intengers
+    for number in [limit, offset]:
+        if type(number) != int:
+            raise Exception("An internal number given when trying to access the database appears to not be a number but instead: \"{}\"".format(number))
+
+    OGTagCollection = []
+
+    with connection.cursor() as cur:
+
+        # Which collumns to extract data from
+        collumns = "id, title, description, url, image_url, author, publish_date, profile"
+
+        profileFilter = "AND profile=ANY(%s)" if profileList != [] else ""
+        queryParameters = (searchQuery, profileList) if profileList != [] else (searchQuery,)
+
+        cur.execute("SELECT {0}, ts_rank_cd(search_vector, query) AS rank FROM {1}, websearch_to_tsquery('{2}', %s) query WHERE scraped=true AND search_vector @@ query {3} ORDER BY rank DESC, publish_date DESC LIMIT {4} OFFSET {5};".format(collumns, tableName, searchConfig, profileFilter, limit, offset), queryParameters)
+
+        for result in cur.fetchall():
+            OGTagCollection.append(SearchResultRecord(*result))
+
+    return OGTagCollection
+
+# Function for finding the [limit] newest scraped articles that has been tagged with [tag]. Returns the articles in the same format as requestOGTagsFromDB
+def requestArticlesByTag(connection, tableName, tag, limit, profileList=[]):
+
+    # Making sure the limit given is actually an intenger
+    if type(limit) != int:
+        raise Exception("An internal number given when trying to access the database appears to not be a number but instead: \"{}\"".format(limit))
+
+    OGTagCollection = []
+
+    with connection.cursor() as cur:
+
+        # Which collumns to extract data from
+        collumns = "id, title, description, url, image_url, author, publish_date, profile"
+
+        profileFilter = "AND profile=ANY(%s)" if profileList != [] else ""
+        queryParameters = ([tag], profileList) if profileList != [] else ([tag],)
+
+        # Using the "contains" operator as that is the one that can use the GIN index on the tags
+        cur.execute("SELECT {} FROM {} WHERE scraped=true AND tags @> %s::text[] {} ORDER BY publish_date DESC LIMIT {};".format(collumns, tableName, profileFilter, limit), queryParameters)
+
+        for result in cur.fetchall():
+            OGTagCollection.append(ArticleRecord(*result))
+
+    return OGTagCollection
+
+# Function for counting how many articles published between [since] and [until] (datetimes, where until defaults to now) each tag has been used in. Returns a list of [tag, count] for the [limit] most used tags, with the most used first
+def requestTagCounts(connection, tableName, since, until=None, limit=50, profileList=[]):
+
+    # Making sure the limit given is actually an intenger
+    if type(limit) != int:
+        raise Exception("An internal number given when trying to access the database appears to not be a number but instead: \"{}\"".format(limit))
+
+    if until == None:
+        until = datetime.now()
+
+    with connection.cursor() as cur:
+        profileFilter = "AND profile=ANY(%s)" if profileList != [] else ""
+        queryParameters = (since, until, profileList) if profileList != [] else (since, until)
+
+        cur.execute("SELECT tag, COUNT(*) AS tag_count FROM {}, UNNEST(tags) AS tag WHERE scraped=true AND publish_date >= %s AND publish_date < %s {} GROUP BY tag ORDER BY tag_count DESC, tag LIMIT {};".format(tableName, profileFilter, limit), queryParameters)
+
+        return [list(result) for result in cur.fetchall()]
+
+# Function for finding the tags that most often is used in the same articles as [tag], optionally only looking at articles published since [since]. Returns a list of [tag, count] with the most frequent first
+def requestCooccurringTags(connection, tableName, tag, limit=20, since=None):
+
+    # Making sure the limit given is actually an intenger
+    if type(limit) != int:
+        raise Exception("An internal number given when trying to access the database appears to not be a number but instead: \"{}\"".format(limit))
+
+    with connection.cursor() as cur:
+        dateFilter = "AND publish_date >= %s" if since != None else ""
+        queryParameters = ([tag], since, tag) if since != None else ([tag], tag)
+
+        cur.execute("SELECT cooccurring_tag, COUNT(*) AS tag_count FROM {}, UNNEST(tags) AS cooccurring_tag WHERE scraped=true AND tags @> %s::text[] {} AND cooccurring_tag != %s GROUP BY cooccurring_tag ORDER BY tag_count DESC, cooccurring_tag LIMIT {};".format(tableName, dateFilter, limit), queryParameters)
+
+        return [list(result) for result in cur.fetchall()]
+
+# Function for finding how many articles each profile publishes per hour, based on the articles inserted during the last [days] days. Returns a dictionary with the profile names as keys
+def requestPublishRates(connection, tableName, profileList, days=14):
+    with connection.cursor() as cur:
+        # Using the publish date when it's known and plausible, and otherwise when the article was inserted
+        cur.execute("SELECT profile, COUNT(*) FROM {} WHERE profile=ANY(%s) AND duplicate_of IS NULL AND LEAST(COALESCE(publish_date, inserted_at), inserted_at) > NOW() - %s * INTERVAL '1 day' GROUP BY profile;".format(tableName), (profileList, days))
+        articleCounts = dict(cur.fetchall())
+
+    return { profile : articleCounts.get(profile, 0) / (days * 24) for profile in profileList }
+
+# The following functions are streaming versions of findUnscrapedArticles, filterArticleURLList and writeOGTagsToDB, which consumes and yields (profile, URL) pairs or OG tags one at a time instead of building the complete lists in memory, so they can be used for backfilling very large amounts of articles
+
+# Generator yielding (profile, URL) for all the articles for the profiles in profileList that hasn't been scraped yet. Uses a server side cursor, so only batchSize articles is read from the DB at a time
+def iterateUnscrapedArticles(connection, tableName, profileList, batchSize=1000):
+    # The cursor has to be declared "with hold" as it would otherwise be closed when the articles are written to the DB while iterating
+    with connection.cursor(name="unscraped_articles", withhold=True) as cur:
+        cur.itersize = batchSize
+        cur.execute("SELECT profile, url FROM {} WHERE profile=ANY(%s) AND scraped=false AND duplicate_of IS NULL ORDER BY profile;".format(tableName), (profileList,))
+        for profile, URL in cur:
+            yield profile, URL
+
+# Generator taking in an iterable of (profile, URL) and only yielding those where the URL isn't already stored in the DB. The URLs are looked up batchSize at a time
+def filterArticleURLStream(connection, tableName, URLStream, batchSize=500):
+    for batch in batchIterator(URLStream, batchSize):
+        with connection.cursor() as cur:
+            cur.execute("SELECT url FROM {} WHERE url = ANY(%s);".format(tableName), ([URL for profile, URL in batch],))
+            storedURLs = set(result[0] for result in cur.fetchall())
+
+        for profile, URL in batch:
+            if URL not in storedURLs:
+                yield profile, URL
+
+# Generator taking in an iterable of OG tags (in the format generated by OSINTtags.collectOGTagsFromNewsSite) and writing them to the DB batchSize at a time, yielding (profile, URL) for those that should be scraped
+def writeOGTagStream(connection, OGTagStream, tableName, batchSize=500, fingerprintIndex=None):
+    for batch in batchIterator(OGTagStream, batchSize):
+        OGTagCollection = {}
+        for tags in batch:
+            OGTagCollection.setdefault(tags['profile'], []).append(tags)
+
+        for URLList in writeOGTagsToDB(connection, OGTagCollection, tableName, fingerprintIndex):
+            for URL in URLList[1:]:
+                yield URLList[0], URL
@@ -6,6 +6,12 @@ import json
 
 import re
 
+# The meta information is returned as a compact record instead of a dictionary
+from OSINTmodules.OSINTrecords import MetaInformation
+
+# Used for optionally profiling the extraction
+from OSINTmodules.OSINTprofiling import profiled
+
 
 # Used for matching the relevant information from LD+JSON
 JSONPatterns = {
@@ -41,6 +47,7 @@ def locateContent(contentDetails, soup, multiple=False, recursive=True):
         return BeautifulSoup("Unknown", "html.parser")
 
 # Function used for removing certain tags with or without class from a soup. Takes in a list of element tag and class in the format: "tag,class;tag,class;..."
+@profiled("cleanSoup", pageArgument=0)
 def cleanSoup(soup, HTMLTagsAndClasses):
     for TagAndClass in HTMLTagsAndClasses.split(";"):
         for tag in soup.find_all(TagAndClass.split(",")[0], class_=TagAndClass.split(",")[1]):
@@ -60,7 +67,8 @@ def extractArticleDetails(contentDetails, soup):
 
     return details
 
-def extractArticleContent(textDetails, soup, clearText=False, delimiter='\n'):
+# Function for locating the html elements containing the article text (and the header image if specified in the profile), without converting them to a string
+def extractArticleElements(textDetails, soup):
 
     # Clean the textlist for unwanted html elements
     if textDetails['remove'] != "":
@@ -80,6 +88,12 @@ def extractArticleContent(textDetails, soup, clearText=False, delimiter='\n'):
     if textList == "Unknown":
         raise Exception("Wasn't able to fetch the text for the following soup:" + str(soup))
 
+    return textList
+
+def extractArticleContent(textDetails, soup, clearText=False, delimiter='\n'):
+
+    textList = extractArticleElements(textDetails, soup)
+
     assembledText = ""
 
     # Loop through all the <p> tags, extract the text and add them to string with newline in between
@@ -91,21 +105,29 @@ def extractArticleContent(textDetails, soup, clearText=False, delimiter='\n'):
 
     return assembledText
 
-# Function for scraping everything of relevans in an article
-def extractAllDetails(currentProfile, articleSource):
+# Function for scraping everything of relevans in an article. If contentAsElements is true, the article content will be returned as a list of the parsed html elements instead of a html string, which can be given directly to OSINTfiles.createMDFile to avoid parsing the html twice
+@profiled("extractAllDetails", pageArgument=1, profileArgument=0)
+def extractAllDetails(currentProfile, articleSource, contentAsElements=False):
 
     # Parsing full source code for the article to a soup
     articleSoup = BeautifulSoup(articleSource, 'html.parser')
 
     articleDetails =    extractArticleDetails(currentProfile['scraping']['details'], articleSoup)
-    articleContent =    extractArticleContent(currentProfile['scraping']['content'], articleSoup)
-    articleClearText =  extractArticleContent(currentProfile['scraping']['content'], articleSoup, True)
+
+    if contentAsElements:
+        articleContent =    extractArticleElements(currentProfile['scraping']['content'], articleSoup)
+        articleClearText =  "".join(element.get_text() + '\n' for element in articleContent)
+    else:
+        articleContent =    extractArticleContent(currentProfile['scraping']['content'], articleSoup)
+        articleClearText =  extractArticleContent(currentProfile['scraping']['content'], articleSoup, True)
 
     return articleDetails, articleContent, articleClearText
 
 # Function for scraping meta information (like title, author and publish date) from articles. This both utilizes the OG tags and LD+JSON data, and while the proccess for extracting the OG tags is fairly simply as those is (nearly) always following the same standard, the LD+JSON data is a little more complicated. Here the data isn't parsed as JSON, but rather as a string where the relevant pieces of information is extracted using regex. It's probably ugly and definitly not the officially "right" way of doing this, but different placement of the information in the JSON object on different websites using different attributes made parsing the information from a python JSON object near impossible. As such, be warned that this function is not for the faint of heart
+@profiled("extractMetaInformation", pageArgument=0)
 def extractMetaInformation(pageSoup):
-    OGTags = {'author' : None, 'publishDate': None}
+    # All the fields start out as None, and can be accessed using the names of the OG tags
+    OGTags = MetaInformation()
 
     # Extract the 3 relevant og tags from the website
     for tag in ["og:title", "og:description", "og:image"]:
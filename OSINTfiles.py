@@ -1,29 +1,408 @@
 # Used for handling relative paths
 from pathlib import Path
 
+# Used for writing files atomically by writing to a temporary file and then renaming it
+import os
+import tempfile
+
+# Used for content addressing and compressing the stored articles
+import hashlib
+import gzip
+
+# Used for storing the raw article pages along with their URL and profile
+import json
+
+# Used for the background writer, so the scraping doesn't have to wait for the disk
+import threading
+import queue
+from concurrent.futures import Future
+
 # For filling out template files like html overview template and markdown template
 from string import Template
 
-# For converting html to markdown
-from markdownify import markdownify
+# Markdownify and bs4 is imported in the functions using them, to keep the import of this module fast
+
+import re
 
 # Used for creating the name of the markdown file in a safe maner
 from OSINTmodules.OSINTmisc import fileSafeString
 
+# Function for reading the umask of the process. On Linux it's read from /proc, as the only other way to read it is to change it, which would affect files created by other threads at the same time
+def readUmask():
+    try:
+        with open("/proc/self/status", "r") as statusFile:
+            for line in statusFile:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+
+    # Only used on systems without /proc, where it's read once when the module is imported
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+processUmask = readUmask()
+
+# Cache for the templates that has already been read and compiled, so they only have to be read from disk once, with the path of the template as key
+templateCache = {}
+templateCacheLock = threading.Lock()
+
+# Function for reading and compiling a template, or returning the already compiled one if it has been loaded before
+def loadTemplate(templateFile):
+    templatePath = str(Path(templateFile).resolve())
+    with templateCacheLock:
+        if templatePath not in templateCache:
+            with open(templatePath, "r") as source:
+                templateCache[templatePath] = Template(source.read())
+        return templateCache[templatePath]
+
+# Function for writing the content to a temporary file next to filePath, and making sure it's on disk. Returns the path of the temporary file, which can then be renamed to filePath. Files ending in .gz will be gzip compressed
+def writeTempFile(content, filePath, mode=None):
+    filePath = Path(filePath)
+    if filePath.suffix == ".gz":
+        content = gzip.compress(content.encode("utf-8"))
+    # The temporary file has to be in the same folder as the final file, as the rename otherwise isn't guaranteed to be atomic
+    fileDescriptor, tempPath = tempfile.mkstemp(dir=filePath.parent, prefix="." + filePath.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fileDescriptor, "wb" if isinstance(content, bytes) else "w") as tempFile:
+            # mkstemp creates the file with 600 permissions, so it's changed to the given mode or what a normal open() would have given it
+            os.fchmod(tempFile.fileno(), mode if mode != None else 0o666 & ~processUmask)
+            tempFile.write(content)
+            tempFile.flush()
+            os.fsync(tempFile.fileno())
+    except:
+        removeTempFile(tempPath)
+        raise
+    return tempPath
+
+def removeTempFile(tempPath):
+    try:
+        os.remove(tempPath)
+    except OSError:
+        pass
+
+# Function for making sure the files renamed in a folder stays renamed even if the machine crashes, which requires the folder itself to be synced to disk
+def syncFolder(folderPath):
+    folderDescriptor = os.open(folderPath, os.O_RDONLY)
+    try:
+        os.fsync(folderDescriptor)
+    finally:
+        os.close(folderDescriptor)
+
+# Function for writing a string to a file in a way where the file will either contain the full content or not exist at all, even if the program crashes in the middle of writing it. Files ending in .gz will be gzip compressed. The mode of the file defaults to the one a normal open() would have given it
+def writeFileAtomic(content, filePath, mode=None):
+    tempPath = writeTempFile(content, filePath, mode)
+    try:
+        os.replace(tempPath, filePath)
+    except:
+        removeTempFile(tempPath)
+        raise
+    syncFolder(Path(filePath).parent)
+
+# Used for normalizing the article text before hashing it, so articles only differing in formatting, casing or punctuation will get the same hash
+contentNormalizationPattern = re.compile(r'[\W_]+')
+
+# Function for generating the hash used for storing the body of an article, based on the content of the article
+def contentHash(content):
+    normalizedContent = contentNormalizationPattern.sub(" ", content.lower()).strip()
+    return hashlib.sha256(normalizedContent.encode("utf-8")).hexdigest()
+
+# Function for getting the path (relative to the folder holding the articles) for the body of an article with the given hash. The files are split into two levels of sub folders based on the start of the hash, to avoid having hundreds of thousands of files in one folder
+def contentAddressedPath(articleHash, compress=False):
+    return "objects/" + articleHash[0:2] + "/" + articleHash[2:4] + "/" + articleHash + (".md.gz" if compress else ".md")
+
+# Function for getting the path (relative to the folder holding the articles) for the file holding the title, source, link and tags of the article with the given URL, along with a reference to the body of the article
+def articleHeaderPath(URL):
+    URLHash = hashlib.sha256(URL.encode("utf-8")).hexdigest()
+    return "headers/" + URLHash[0:2] + "/" + URLHash[2:4] + "/" + URLHash + ".md"
+
+# Function for finding the body of an article that has already been stored with the given hash, compressed or not. Will return the relative path of the body if it exist and None if it doesn't
+def findStoredArticle(articleHash, articleRoot="./articles/"):
+    for compress in [False, True]:
+        relativePath = contentAddressedPath(articleHash, compress)
+        if os.path.isfile(Path(articleRoot + relativePath)):
+            return relativePath
+    return None
+
+# The line in a header file that refers to the body of the article, using the same syntax Obsidian uses for embedding a note
+bodyReferencePattern = re.compile(r'^!\[\[(objects/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.md(?:\.gz)?)\]\]$', re.MULTILINE)
+
+def bodyReference(bodyPath):
+    return "![[" + bodyPath + "]]"
+
+# Function for getting the full path of an article from the file path stored in the DB. The articles written without articleRoot is stored in the DB without the .md extension
+def articleFilePath(filePath, articleRoot="./articles/"):
+    if not (filePath.endswith(".md") or filePath.endswith(".md.gz")):
+        filePath += ".md"
+    return Path(articleRoot + filePath)
+
+def readStoredFile(fullPath):
+    if fullPath.suffix == ".gz":
+        with gzip.open(fullPath, "rt", encoding="utf-8") as storedFile:
+            return storedFile.read()
+    else:
+        with open(fullPath, "r") as storedFile:
+            return storedFile.read()
+
+# Function for reading an article from the folder holding the articles, using the file path stored in the database, no matter whether it's compressed or not. For articles stored with a header file, the body of the article is read too and inserted in place of the reference to it
+def readArticleFile(filePath, articleRoot="./articles/"):
+    articleText = readStoredFile(articleFilePath(filePath, articleRoot))
+    return bodyReferencePattern.sub(lambda reference: readStoredFile(Path(articleRoot + reference.group(1))), articleText)
+
+# Function for storing the raw source of an article page compressed, so the article can be extracted again later (for example when the profile has been changed) without having to download it again. The pages are stored in a folder for each profile, using the hash of the URL as file name
+def storeRawPage(profileName, URL, pageSource, rawRoot="./articles/raw/"):
+    if isinstance(pageSource, bytes):
+        pageSource = pageSource.decode("utf-8", errors="replace")
+
+    os.makedirs(Path(rawRoot + profileName), mode=0o750, exist_ok=True)
+    rawPagePath = rawRoot + profileName + "/" + hashlib.sha256(URL.encode("utf-8")).hexdigest() + ".json.gz"
+
+    writeFileAtomic(json.dumps({'profile': profileName, 'url': URL, 'source': pageSource}), rawPagePath)
+
+    return rawPagePath
+
+def readRawPage(rawPagePath):
+    with gzip.open(Path(rawPagePath), "rt", encoding="utf-8") as rawPageFile:
+        return json.load(rawPageFile)
+
+# Function for listing the paths of all the stored raw pages, optionally only for the profiles in profileList
+def listRawPages(rawRoot="./articles/raw/", profileList=[]):
+    if not os.path.isdir(Path(rawRoot)):
+        return []
+
+    rawPagePaths = []
+    for profileName in sorted(os.listdir(Path(rawRoot))):
+        if profileList != [] and profileName not in profileList:
+            continue
+        profileFolder = Path(rawRoot + profileName)
+        if os.path.isdir(profileFolder):
+            rawPagePaths.extend(str(profileFolder / fileName) for fileName in sorted(os.listdir(profileFolder)) if fileName.endswith(".json.gz"))
+
+    return rawPagePaths
+
 # Function for writing details from a template to a file
 def writeTemplateToFile(contentList, templateFile, newFilePath):
-    # Open the template for the given file
-    with open(Path(templateFile), "r") as source:
-        # Read the template file
-        sourceTemplate = Template(source.read())
-        # Load the template but fill in the values from contentList
-        filledTemplate = sourceTemplate.substitute(contentList)
-        # Write the filled template to a new file that can then be used
-        with open(Path(newFilePath), "w") as newF:
-            newF.write(filledTemplate)
-
-# Function for taking in some details about an articles and creating a markdown file with those
-def createMDFile(sourceName, sourceURL, articleDetails, articleContent, articleTags, MDFilePath="./"):
+    # Load the template (which is only read from disk the first time) but fill in the values from contentList
+    filledTemplate = loadTemplate(templateFile).substitute(contentList)
+    # Write the filled template to a new file that can then be used
+    writeFileAtomic(filledTemplate, newFilePath)
+
+# Class for writing the markdown files from a background thread, so the scraping can continue while the files are written to disk. Every write returns a future that will only be resolved when the file has been durably written, so the article isn't marked as scraped before the file actually exist. The files waiting when the writer gets to them are written together, so each folder only has to be synced once for all of them instead of once for every file
+class MDFileWriter():
+    def __init__(self, templateFile="./tools/markdownTemplate.md", batchSize=50):
+        # Making sure the template is loaded and compiled before any articles are written
+        self.template = loadTemplate(templateFile)
+        self.batchSize = batchSize
+        self.writeQueue = queue.Queue()
+        self.writerThread = threading.Thread(target=self.writeLoop, daemon=True)
+        self.writerThread.start()
+
+    # Will queue up the contentList to be written to newFilePath, and return a future that will have returnValue as result when the file has been written
+    def submit(self, contentList, newFilePath, returnValue=None):
+        return self.submitFiles([(contentList, newFilePath)], returnValue)
+
+    # Will queue up a list of (content, newFilePath) to be written in order, where content is either a contentList for the template or a string that will be written as is. The future returned will have returnValue as result when all the files has been written, and if one of them fails the rest won't be written
+    def submitFiles(self, files, returnValue=None):
+        future = Future()
+        self.writeQueue.put((files, returnValue, future))
+        return future
+
+    def writeLoop(self):
+        while True:
+            # Waiting for the first job, and then taking whatever else is waiting in the queue (up to the batch size) so they can be handled together
+            batch = [self.writeQueue.get()]
+            while len(batch) < self.batchSize and batch[-1] != None:
+                try:
+                    batch.append(self.writeQueue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None is used to signal that the writer should stop, once the jobs before it has been written
+            if batch[-1] == None:
+                self.writeBatch(batch[:-1])
+                return
+
+            self.writeBatch(batch)
+
+    # Writes the files for a batch of jobs. The files are written in rounds, with the first file of every job in the first round and so on, and the folders for a round is synced before the next round is renamed into place, so the later files of a job (like the header of an article) never exist on disk without the earlier ones (like the body it refers to)
+    def writeBatch(self, batch):
+        failedJobs = {}
+        for fileIndex in range(max([len(job[0]) for job in batch] + [0])):
+            # The jobs that has renamed a file into each folder in this round
+            renamedFolders = {}
+            for jobIndex, (files, returnValue, future) in enumerate(batch):
+                if fileIndex >= len(files) or jobIndex in failedJobs:
+                    continue
+
+                content, newFilePath = files[fileIndex]
+                try:
+                    tempPath = writeTempFile(content if isinstance(content, str) else self.template.substitute(content), newFilePath)
+                    try:
+                        os.replace(tempPath, newFilePath)
+                    except:
+                        removeTempFile(tempPath)
+                        raise
+                    renamedFolders.setdefault(Path(newFilePath).parent, []).append(jobIndex)
+                except Exception as e:
+                    failedJobs[jobIndex] = e
+
+            for folder, jobIndexes in renamedFolders.items():
+                try:
+                    syncFolder(folder)
+                except Exception as e:
+                    # The files renamed into the folder can't be trusted to be on disk if it couldn't be synced
+                    for jobIndex in jobIndexes:
+                        failedJobs.setdefault(jobIndex, e)
+
+        for jobIndex, (files, returnValue, future) in enumerate(batch):
+            if jobIndex in failedJobs:
+                future.set_exception(failedJobs[jobIndex])
+            else:
+                future.set_result(returnValue)
+
+    # Will wait for all the queued files to be written and then stop the background thread
+    def close(self):
+        self.writeQueue.put(None)
+        self.writerThread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+# Used for collapsing whitespace in text the same way it would be rendered in a browser
+whitespacePattern = re.compile(r'[\t \r\n]+')
+# Characthers that would otherwise be interpreted as markdown formatting
+markdownEscapePattern = re.compile(r'([_*])')
+
+# The bullets used for unordered lists, depending on how deep they're nested
+listBullets = "*+-"
+
+# The heading elements and the level they each represent
+headingLevels = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+# Function for converting the children of a html element to markdown
+def convertChildren(element, inPre=False):
+    return "".join(convertElement(child, inPre) for child in element.children)
+
+# Function for converting a single html element (or string) from an already parsed soup to markdown. Only handles the elements that is actually used in news articles, and everything else will simply have it's text content converted
+def convertElement(element, inPre=False):
+    from bs4.element import NavigableString, Comment, Tag
+
+    if isinstance(element, Comment):
+        return ""
+
+    if isinstance(element, NavigableString):
+        if inPre:
+            return str(element)
+        return markdownEscapePattern.sub(r'\\\1', whitespacePattern.sub(" ", str(element)))
+
+    if not isinstance(element, Tag):
+        return ""
+
+    tagName = element.name
+
+    if tagName in ["script", "style", "noscript"]:
+        return ""
+
+    if tagName == "pre":
+        return "\n```\n" + convertChildren(element, True).rstrip("\n") + "\n```\n"
+
+    # The text in code isn't escaped, as the escaping would be shown as is
+    if tagName == "code":
+        if inPre:
+            return element.get_text()
+        return "`" + whitespacePattern.sub(" ", element.get_text()) + "`"
+
+    text = convertChildren(element, inPre)
+
+    if tagName in ["p", "div", "section", "article", "figure", "figcaption"]:
+        text = text.strip()
+        return "\n\n" + text + "\n\n" if text else ""
+
+    elif tagName in headingLevels:
+        text = text.strip()
+        if not text:
+            return ""
+        # Using the same underlined style for h1 and h2 as markdownify does by default
+        if headingLevels[tagName] == 1:
+            return "\n\n" + text + "\n" + "=" * len(text) + "\n\n"
+        elif headingLevels[tagName] == 2:
+            return "\n\n" + text + "\n" + "-" * len(text) + "\n\n"
+        return "\n\n" + "#" * headingLevels[tagName] + " " + text + "\n\n"
+
+    elif tagName in ["strong", "b"]:
+        return "**" + text.strip() + "**" if text.strip() else ""
+
+    elif tagName in ["em", "i"]:
+        return "*" + text.strip() + "*" if text.strip() else ""
+
+    elif tagName == "a":
+        href = element.get("href")
+        if not href or not text.strip():
+            return text
+        title = element.get("title")
+        return "[" + text.strip() + "](" + href + (' "' + title.replace('"', '\\"') + '"' if title else "") + ")"
+
+    elif tagName == "img":
+        title = element.get("title")
+        return "![" + (element.get("alt") or "") + "](" + (element.get("src") or "") + (' "' + title.replace('"', '\\"') + '"' if title else "") + ")"
+
+    elif tagName == "br":
+        return "  \n"
+
+    elif tagName == "hr":
+        return "\n\n---\n\n"
+
+    elif tagName == "blockquote":
+        # Removing the excesive blank lines before quoting the lines, as they would otherwise end up as empty quoted lines
+        text = re.sub(r'\n{3,}', "\n\n", text).strip()
+        if not text:
+            return ""
+        return "\n\n" + "\n".join("> " + line if line else ">" for line in text.split("\n")) + "\n\n"
+
+    elif tagName in ["ul", "ol"]:
+        items = "".join(convertElement(item, inPre) for item in element.find_all("li", recursive=False))
+        # Nested lists follows directly after the text of the item they're in
+        if element.find_parent("li") != None:
+            return "\n" + items.rstrip()
+        return "\n\n" + items + "\n\n"
+
+    elif tagName == "li":
+        text = re.sub(r'\n{3,}', "\n\n", text).strip()
+        if not text:
+            return "\n"
+
+        parent = element.parent
+        if parent != None and parent.name == "ol":
+            start = parent.get("start")
+            bullet = str((int(start) if start and str(start).isnumeric() else 1) + len(element.find_previous_siblings("li"))) + ". "
+        else:
+            # The bullet used alternates with how deep the list is nested, the same way markdownify does it
+            depth = len(element.find_parents("ul")) - 1
+            bullet = listBullets[depth % len(listBullets)] + " "
+
+        # Indenting the lines after the first one, so nested lists and paragraphs will stay in the item
+        return bullet + "\n".join(" " * len(bullet) + line if line else "" for line in text.split("\n"))[len(bullet):] + "\n"
+
+    elif tagName == "table":
+        # Tables are rare in articles, so they're simply converted by markdownify instead of handling all the different ways they can be structured
+        from markdownify import markdownify
+        return "\n\n" + markdownify(str(element)).strip("\n") + "\n\n"
+
+    return text
+
+# Function for converting a list of html elements, like the one returned by OSINTextract.extractArticleElements, directly to markdown without having to serialize them to html and parse them again
+def elementsToMarkdown(elementList):
+    markdown = "".join(convertElement(element) for element in elementList)
+    # Removing the excesive blank lines created when block elements follows each other
+    return re.sub(r'\n{3,}', "\n\n", markdown).strip("\n")
+
+# Function for taking in some details about an articles and creating a markdown file with those. The articleContent can either be a html string or a list of already parsed html elements, the latter which is faster as it doesn't have to be parsed again. If a MDFileWriter is given as writer, the file will be written in the background, and a future that resolves to the file name once the file is on disk will be returned instead of the file name itself.
+# If articleRoot is given (normally "./articles/") the body of the article will instead be stored based on the hash of it's content, so articles with the same body (like the same wire story from different profiles) only has their body stored once. The title, source, link and tags are stored in a small header file for each article, which refers to the body, so an article will never be shown with the details of another. The path of the header file relative to articleRoot, which should be stored as the file path in the DB, will be returned, and readArticleFile will return the full article for it
+def createMDFile(sourceName, sourceURL, articleDetails, articleContent, articleTags, MDFilePath="./", writer=None, articleRoot=None, compress=False):
 
     # Define the title
     title = articleDetails[0]
@@ -44,7 +423,12 @@ def createMDFile(sourceName, sourceURL, articleDetails, articleContent, articleT
         MDDetails += "+ " + detailLabels[i] + detail + '\n'
 
     # Convert the scraped article to markdown
-    MDContent = markdownify(articleContent)
+    if isinstance(articleContent, str):
+        # For converting html to markdown
+        from markdownify import markdownify
+        MDContent = markdownify(articleContent)
+    else:
+        MDContent = elementsToMarkdown(articleContent)
 
     # And lastly, some tags
     MDTags = "[[" + "]] [[".join(articleTags) + "]] [[" + sourceName + "]]"
@@ -58,10 +442,41 @@ def createMDFile(sourceName, sourceURL, articleDetails, articleContent, articleT
         'tags': MDTags
     }
 
-    # Converting the title of the article to a string that can be used as filename and then opening the file in append mode (will create file if it doesn't exist)
-    MDFileName = MDFilePath + fileSafeString(articleDetails[0]) + ".md"
+    if articleRoot != None:
+        articleHash = contentHash(MDContent)
+        bodyPath = findStoredArticle(articleHash, articleRoot)
+
+        filesToWrite = []
+        # If the same body already has been stored, there's no need to write it again
+        if bodyPath == None:
+            bodyPath = contentAddressedPath(articleHash, compress)
+            filesToWrite.append((MDContent, articleRoot + bodyPath))
+
+        contentList['articleContent'] = bodyReference(bodyPath)
+        headerPath = articleHeaderPath(sourceURL)
+        filesToWrite.append((contentList, articleRoot + headerPath))
+
+        for content, newFilePath in filesToWrite:
+            os.makedirs(Path(newFilePath).parent, mode=0o750, exist_ok=True)
+
+        if writer != None:
+            return writer.submitFiles(filesToWrite, headerPath)
+
+        # The body is written before the header, so the header never refers to a body that doesn't exist
+        template = loadTemplate("./tools/markdownTemplate.md")
+        for content, newFilePath in filesToWrite:
+            writeFileAtomic(content if isinstance(content, str) else template.substitute(content), newFilePath)
+
+        return headerPath
+
+    # Converting the title of the article to a string that can be used as filename
+    fileName = fileSafeString(articleDetails[0])
+    MDFileName = MDFilePath + fileName + ".md"
+
+    if writer != None:
+        return writer.submit(contentList, MDFileName, fileName)
 
     writeTemplateToFile(contentList, "./tools/markdownTemplate.md", MDFileName)
 
     # Returning the file name, so it's possible to locate the file
-    return fileSafeString(articleDetails[0])
+    return fileName
@@ -8,6 +8,13 @@ from datetime import datetime
 
 from pathlib import Path
 
+# Used for splitting iterators into batches
+import itertools
+
+# Used for running python with -X importtime when measuring how long it takes to import the modules
+import subprocess
+import sys
+
 
 try:
     # For if the user wants verbose output
@@ -53,3 +60,30 @@ def fileSafeString(unsafeString):
     unsafeString = unsafeString.strip().replace(" ", "-")
     safeString = ''.join(c for c in unsafeString if c in allowedCharacthers)
     return safeString
+
+# Function for measuring how long it takes to import [moduleName] (like "OSINTmodules.OSINTuser") in a fresh python process, using python's -X importtime. Returns the total import time in microseconds along with a list of [cumulative time, module] for the slowest imports, sorted with the slowest first
+def measureImportTime(moduleName, slowestCount=10):
+    importProcess = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + moduleName], capture_output=True, text=True)
+    if importProcess.returncode != 0:
+        raise Exception("Failed to import {}: {}".format(moduleName, importProcess.stderr.strip().split("\n")[-1]))
+
+    importTimes = []
+    for line in importProcess.stderr.split("\n"):
+        # The lines are in the format "import time: self [us] | cumulative | imported package"
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            selfTime, cumulativeTime, importedModule = line[len("import time:"):].split("|")
+            importTimes.append([int(cumulativeTime), importedModule.strip()])
+
+    # The module itself is the last one to finish importing, so it's cumulative time is the total time
+    totalTime = importTimes[-1][0] if importTimes != [] else 0
+
+    return totalTime, sorted(importTimes, reverse=True)[:slowestCount]
+
+# Function for splitting an iterable (which can be a generator) into lists of at most batchSize elements, without reading more than one batch into memory at a time
+def batchIterator(iterable, batchSize):
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, batchSize))
+        if batch == []:
+            return
+        yield batch
@@ -0,0 +1,331 @@
+# Used for storing the entries in the journal
+import json
+
+import os
+
+# Used for handling relative paths
+from pathlib import Path
+
+# Used for generating an ID for each cycle
+from datetime import datetime
+
+# Used for collecting the OG tags in parallel
+from concurrent.futures import ThreadPoolExecutor
+
+# Used for holding the tasks running in parallel when streaming
+from collections import deque
+
+# Used for re-extracting articles on all cores
+from multiprocessing import Pool
+
+from OSINTmodules.OSINTmisc import printDebug, createNewsSiteFolder
+from OSINTmodules.OSINTscraping import gatherArticleURLs
+from OSINTmodules.OSINTtags import collectOGTagsFromNewsSite
+from OSINTmodules.OSINTdatabase import filterArticleURLList, writeOGTagsToDB, findUnscrapedArticles, markAsScraped, markAsDuplicate, filterArticleURLStream, writeOGTagStream
+from OSINTmodules.OSINTtext import simHash
+
+# Class for the append-only journal keeping track of how far each URL has come in the current scrape cycle, so that the cycle can be resumed from where it stopped if the program crashes. The stages an URL goes through is "gathered", "ogtags", "stored" and "scraped", and URLs that are "skipped" (because the page couldn't be scraped or was a duplicate) or "failed" won't be processed further in the cycle
+class CycleJournal():
+    def __init__(self, journalPath="./logs/cycleJournal.jsonl"):
+        self.journalPath = Path(journalPath)
+        self.cycleID = None
+        # The latest entry for each URL in the current cycle, with the URL as key
+        self.articles = {}
+
+        if self.journalPath.exists():
+            self.loadJournal()
+
+    def loadJournal(self):
+        with open(self.journalPath, "r") as journalFile:
+            for line in journalFile:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # The last line might only be partially written if the program crashed while writing it
+                    continue
+
+                if entry['stage'] == "cycleStarted":
+                    self.cycleID = entry['cycle']
+                    self.articles = {}
+                elif entry['stage'] == "cycleDone":
+                    self.cycleID = None
+                    self.articles = {}
+                elif entry['cycle'] == self.cycleID:
+                    self.articles[entry['url']] = entry
+
+    # Returns true if the journal contains a cycle that was started but never finished
+    def hasUnfinishedCycle(self):
+        return self.cycleID != None
+
+    def writeEntries(self, entries, mode="a"):
+        with open(self.journalPath, mode) as journalFile:
+            for entry in entries:
+                # The OG tag records are stored as dictionaries, which writeOGTagsToDB accepts too when the journal is loaded again
+                journalFile.write(json.dumps(entry, default=lambda record: record.asDict()) + "\n")
+            journalFile.flush()
+            os.fsync(journalFile.fileno())
+
+    # Will start a new cycle with the entries (dicts with at least the url and profile) that was gathered for it, and since the previous cycle is done at this point, the journal is started over so it doesn't grow forever. The start of the cycle and the gathered entries are written together, so a cycle is never started without them
+    def startCycle(self, gatheredEntries=[]):
+        self.cycleID = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        self.articles = {}
+        self.writeEntries([{'cycle': self.cycleID, 'stage': "cycleStarted"}] + self.createEntries("gathered", gatheredEntries), "w")
+
+    def finishCycle(self):
+        self.writeEntries([{'cycle': self.cycleID, 'stage': "cycleDone"}])
+        self.cycleID = None
+        self.articles = {}
+
+    def createEntries(self, stage, entries):
+        journalEntries = []
+        for entry in entries:
+            journalEntry = dict(entry, cycle=self.cycleID, stage=stage)
+            self.articles[entry['url']] = journalEntry
+            journalEntries.append(journalEntry)
+        return journalEntries
+
+    # Record that the URL's for a list of entries (dicts with at least the url and profile) has reached [stage]
+    def recordStage(self, stage, entries):
+        journalEntries = self.createEntries(stage, entries)
+        if journalEntries != []:
+            self.writeEntries(journalEntries)
+
+    # Returns the entries for the URL's that currently is at [stage]
+    def articlesAtStage(self, stage):
+        return [entry for entry in self.articles.values() if entry['stage'] == stage]
+
+# Function for collecting the OG tags for a single URL, returning the journal entry for it
+def collectOGTagsForURL(profileName, URL):
+    OGTags = collectOGTagsFromNewsSite(profileName, [URL])[profileName]
+    if OGTags == []:
+        return {'url': URL, 'profile': profileName, 'tags': None}
+    else:
+        return {'url': URL, 'profile': profileName, 'tags': OGTags[0]}
+
+# Same as collectOGTagsForURL, but where the URL is skipped (as if the page couldn't be scraped) if collecting the OG tags fails, so one failing URL won't stop a stream of them
+def collectOGTagsForURLSafely(profileName, URL):
+    try:
+        return collectOGTagsForURL(profileName, URL)
+    except Exception as e:
+        printDebug("Failed to collect OG tags for {}: {}".format(URL, e))
+        return {'url': URL, 'profile': profileName, 'tags': None}
+
+# Function for storing the result of scrapeArticle for an article in the DB. The result is either the file path, or an OSINTrecords.ScrapedArticleRecord with the file path, tags and clear text of the article, in which case the tags, search vector and content fingerprint is stored too. If a FingerprintIndex with the content fingerprints (see OSINTdatabase.loadFingerprintIndex) is given as contentFingerprintIndex, articles with nearly the same content as one already in it will be marked as duplicates
+def storeScrapedArticle(connection, tableName, URL, scrapeResult, contentFingerprintIndex=None):
+    if isinstance(scrapeResult, str):
+        markAsScraped(connection, URL, scrapeResult, tableName)
+        return
+
+    contentFingerprint = simHash(scrapeResult['clearText']) if scrapeResult['clearText'] else None
+    articleID = markAsScraped(connection, URL, scrapeResult['filePath'], tableName, contentFingerprint, scrapeResult['clearText'], scrapeResult['tags'] or [])
+
+    if contentFingerprintIndex != None and contentFingerprint != None and articleID != None:
+        duplicateOf = contentFingerprintIndex.findNearDuplicate(contentFingerprint)
+        if duplicateOf != None and duplicateOf != articleID:
+            markAsDuplicate(connection, URL, duplicateOf, tableName)
+        else:
+            contentFingerprintIndex.add(articleID, contentFingerprint)
+
+# Function for running a complete scrape cycle over [profiles] (the content of the profile files, as returned by OSINTprofiles.getProfiles), where the progress for each URL is written to a journal, so that a cycle that was interrupted will be resumed from the last completed stage for each URL the next time this is called.
+# scrapeArticle is a function taking the name of the profile and the URL of an article, which should scrape the article and create the markdown file for it, and return either the file path that should be stored in the DB or a OSINTrecords.ScrapedArticleRecord (see storeScrapedArticle), or None if the article should be skipped. If a PollScheduler is given as scheduler, only the profiles that are due will be polled. Returns the number of articles scraped
+def runScrapeCycle(connection, profiles, tableName, scrapeArticle, journalPath="./logs/cycleJournal.jsonl", fingerprintIndex=None, maxWorkers=30, scheduler=None, contentFingerprintIndex=None):
+    journal = CycleJournal(journalPath)
+
+    if journal.hasUnfinishedCycle():
+        printDebug("Resuming unfinished scrape cycle {} with {} articles".format(journal.cycleID, len(journal.articles)))
+    else:
+        # The cycle is only started in the journal once the URLs has been gathered, as a failure while gathering would otherwise leave an empty cycle that would be "resumed" the next time instead of gathering again
+        if scheduler != None:
+            scheduler.refreshPublishRates(connection, tableName, [json.loads(profile)['source']['profileName'] for profile in profiles])
+            profiles, maxURLs = scheduler.dueProfiles(profiles)
+        else:
+            maxURLs = {}
+
+        gatheredURLLists = gatherArticleURLs(profiles, maxURLs)
+        gatheredCounts = { URLList[0] : len(URLList) - 1 for URLList in gatheredURLLists }
+
+        # Only the URLs not already stored in the DB is collected, so only what has changed since the previous cycle is processed
+        articleURLLists = filterArticleURLList(connection, tableName, gatheredURLLists)
+
+        journal.startCycle([{'url': URL, 'profile': URLList[0]} for URLList in articleURLLists for URL in URLList[1:]])
+
+        if scheduler != None:
+            for URLList in articleURLLists:
+                scheduler.recordPoll(URLList[0], gatheredCounts[URLList[0]], len(URLList) - 1)
+            scheduler.save()
+        printDebug("Gathered {} new article URLs".format(len(journal.articles)))
+
+    # Collecting the OG tags for the URLs that hasn't had them collected yet
+    gatheredArticles = journal.articlesAtStage("gathered")
+    if gatheredArticles != []:
+        with ThreadPoolExecutor(max_workers = maxWorkers) as executor:
+            futures = [executor.submit(collectOGTagsForURL, entry['profile'], entry['url']) for entry in gatheredArticles]
+            for gatheredEntry, future in zip(gatheredArticles, futures):
+                # Articles failing here is marked as failed, as they would otherwise be stuck at "gathered" and keep the cycle from ever finishing
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    printDebug("Failed to collect OG tags for {}: {}".format(gatheredEntry['url'], e))
+                    journal.recordStage("failed", [dict(gatheredEntry, error=str(e))])
+                    continue
+
+                if entry['tags'] == None:
+                    journal.recordStage("skipped", [entry])
+                else:
+                    journal.recordStage("ogtags", [entry])
+
+    # Writing the collected OG tags to the DB. writeOGTagsToDB skips URLs that is already stored, so articles that were written to the DB just before a crash won't be stored twice
+    OGTagArticles = journal.articlesAtStage("ogtags")
+    if OGTagArticles != []:
+        OGTagCollection = {}
+        for entry in OGTagArticles:
+            OGTagCollection.setdefault(entry['profile'], []).append(entry['tags'])
+
+        try:
+            writeOGTagsToDB(connection, OGTagCollection, tableName, fingerprintIndex)
+        except Exception as e:
+            printDebug("Failed to write the OG tags to the DB: {}".format(e))
+            # Rolling back the failed transaction, so the connection can still be used
+            connection.rollback()
+            journal.recordStage("failed", [{'url': entry['url'], 'profile': entry['profile'], 'error': str(e)} for entry in OGTagArticles])
+        else:
+            # Looking up which of the articles that are now waiting to be scraped in the DB instead of using the URLs returned by writeOGTagsToDB, since the tags might have been written just before a crash in which case they wouldn't be returned as new
+            unscrapedURLs = set(URL for URLList in findUnscrapedArticles(connection, tableName, list(OGTagCollection)) for URL in URLList[1:])
+
+            journal.recordStage("stored", [{'url': entry['url'], 'profile': entry['profile']} for entry in OGTagArticles if entry['url'] in unscrapedURLs])
+            journal.recordStage("skipped", [{'url': entry['url'], 'profile': entry['profile']} for entry in OGTagArticles if entry['url'] not in unscrapedURLs])
+
+    # And lastly scraping the full articles
+    scrapedCount = 0
+    for entry in journal.articlesAtStage("stored"):
+        try:
+            scrapeResult = scrapeArticle(entry['profile'], entry['url'])
+        except Exception as e:
+            printDebug("Failed to scrape {}: {}".format(entry['url'], e))
+            journal.recordStage("failed", [dict(entry, error=str(e))])
+            continue
+
+        if scrapeResult == None:
+            journal.recordStage("skipped", [entry])
+        else:
+            storeScrapedArticle(connection, tableName, entry['url'], scrapeResult, contentFingerprintIndex)
+            journal.recordStage("scraped", [entry])
+            scrapedCount += 1
+
+    journal.finishCycle()
+
+    return scrapedCount
+
+# Generator for running function on every element in iterable in parallel, yielding the results in the same order as the elements. At most maxInFlight elements is read from the iterable before their results has been yielded, so memory use stays constant no matter how long the iterable is
+def boundedParallelMap(function, iterable, maxWorkers=30, maxInFlight=100):
+    with ThreadPoolExecutor(max_workers = maxWorkers) as executor:
+        futures = deque()
+        for element in iterable:
+            futures.append(executor.submit(function, element))
+            if len(futures) >= maxInFlight:
+                yield futures.popleft().result()
+
+        while futures:
+            yield futures.popleft().result()
+
+# Generator for converting the lists of URLs used by the non-streaming functions (lists with the profile first and then the URLs) to a stream of (profile, URL)
+def iterateURLLists(articleURLLists):
+    for URLList in articleURLLists:
+        for URL in URLList[1:]:
+            yield URLList[0], URL
+
+# Generator taking in an iterable of (profile, URL) and yielding the OG tags for each of them, skipping those that couldn't be scraped or failed
+def streamOGTags(URLStream, maxWorkers=30, maxInFlight=100):
+    for entry in boundedParallelMap(lambda article: collectOGTagsForURLSafely(*article), URLStream, maxWorkers, maxInFlight):
+        if entry['tags'] != None:
+            yield entry['tags']
+
+# Function for backfilling a (potentially very large) iterable of (profile, URL), where each URL goes through all the stages one batch at a time instead of every stage having to finish for all URLs before the next starts, so it will run in constant memory. If scrapeArticle (same as for runScrapeCycle) is given, the full articles will be scraped too. Returns the number of new articles stored
+def streamBackfill(connection, tableName, URLStream, scrapeArticle=None, fingerprintIndex=None, maxWorkers=30, maxInFlight=100, batchSize=500, contentFingerprintIndex=None):
+    newURLs = filterArticleURLStream(connection, tableName, URLStream, batchSize)
+    OGTags = streamOGTags(newURLs, maxWorkers, maxInFlight)
+    storedURLs = writeOGTagStream(connection, OGTags, tableName, batchSize, fingerprintIndex)
+
+    storedCount = 0
+    for profile, URL in storedURLs:
+        storedCount += 1
+
+        if scrapeArticle != None:
+            try:
+                scrapeResult = scrapeArticle(profile, URL)
+            except Exception as e:
+                printDebug("Failed to scrape {}: {}".format(URL, e))
+                continue
+
+            if scrapeResult != None:
+                storeScrapedArticle(connection, tableName, URL, scrapeResult, contentFingerprintIndex)
+
+        if storedCount % 1000 == 0:
+            printDebug("Backfilled {} articles".format(storedCount))
+
+    return storedCount
+
+# Function run in the worker processes by reprocessRawPages, extracting a single stored raw page again and writing the markdown file for it. Returns the URL, file path, tags, clear text and content fingerprint of the article
+def reprocessRawPage(task):
+    # Imported here as they're only needed in the worker processes
+    from OSINTmodules.OSINTfiles import readRawPage, createMDFile
+    from OSINTmodules.OSINTextract import extractAllDetails
+    from OSINTmodules.OSINTtext import cleanText, generateTags, simHash
+
+    rawPagePath, currentProfile, articleRoot, compress = task
+
+    from OSINTmodules.OSINTprofiling import setCurrentProfile
+
+    rawPage = readRawPage(rawPagePath)
+    profileName = rawPage['profile']
+    setCurrentProfile(profileName)
+
+    articleDetails, articleContent, articleClearText = extractAllDetails(currentProfile, rawPage['source'], contentAsElements=True)
+    articleTags = generateTags(cleanText(articleClearText))
+
+    if articleRoot != None:
+        filePath = createMDFile(currentProfile['source']['name'], rawPage['url'], articleDetails, articleContent, articleTags, articleRoot=articleRoot, compress=compress)
+    else:
+        filePath = profileName + "/" + createMDFile(currentProfile['source']['name'], rawPage['url'], articleDetails, articleContent, articleTags, "./articles/" + profileName + "/")
+
+    return rawPage['url'], filePath, articleTags, articleClearText, simHash(articleClearText)
+
+def reprocessRawPageSafely(task):
+    try:
+        return reprocessRawPage(task)
+    except Exception as e:
+        return task[0], e
+
+# Function for extracting, tagging and writing the markdown files again for all the raw pages stored with OSINTfiles.storeRawPage, optionally only for the profiles in profileList, and then updating the articles in the DB. [profiles] is the content of the profile files (as returned by OSINTprofiles.getProfiles). The work is split over [processes] processes (defaults to the number of cores). If articleRoot is given the articles will be stored based on their content (see OSINTfiles.createMDFile). Returns the number of articles reprocessed
+def reprocessRawPages(connection, tableName, profiles, profileList=[], rawRoot="./articles/raw/", articleRoot=None, compress=False, processes=None):
+    from OSINTmodules.OSINTfiles import listRawPages
+
+    profileDetails = {}
+    for profile in profiles:
+        currentProfile = json.loads(profile)
+        profileDetails[currentProfile['source']['profileName']] = currentProfile
+
+    # Only using the profiles that both was asked for and exists, as the raw pages can't be extracted without the profile
+    profileList = [profileName for profileName in (profileList if profileList != [] else list(profileDetails)) if profileName in profileDetails]
+
+    if articleRoot == None:
+        for profileName in profileList:
+            createNewsSiteFolder(profileName)
+
+    tasks = [(rawPagePath, profileDetails[Path(rawPagePath).parent.name], articleRoot, compress) for rawPagePath in listRawPages(rawRoot, profileList)]
+    printDebug("Reprocessing {} stored pages".format(len(tasks)))
+
+    reprocessedCount = 0
+    with Pool(processes) as pool:
+        for i, result in enumerate(pool.imap_unordered(reprocessRawPageSafely, tasks, chunksize=16)):
+            if isinstance(result[1], Exception):
+                printDebug("Failed to reprocess {}: {}".format(result[0], result[1]))
+            else:
+                URL, filePath, articleTags, articleClearText, contentFingerprint = result
+                markAsScraped(connection, URL, filePath, tableName, contentFingerprint, articleClearText, articleTags)
+                reprocessedCount += 1
+
+            if (i + 1) % 100 == 0 or i + 1 == len(tasks):
+                printDebug("Reprocessed {} of {} pages".format(i + 1, len(tasks)))
+
+    return reprocessedCount
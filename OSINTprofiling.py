@@ -0,0 +1,167 @@
+# cProfile and pstats, used for profiling the functions in the hot path when extracting articles, is only imported once a call is sampled, as importing them slows down the import of every module using the profiling hooks
+
+# Used for timing the functions
+import time
+
+# Used for deciding which calls should be profiled with cProfile
+import random
+
+# Used for keeping track of the profile being processed in each thread
+import threading
+
+# Used for keeping the profiled function's name and docstring
+import functools
+
+import os
+import json
+
+# Used for handling relative paths
+from pathlib import Path
+
+from OSINTmodules.OSINTmisc import fileSafeString
+
+# The settings for the profiling, which is disabled by default so the hooks won't cost anything unless enabled with enableProfiling
+profilingSettings = {
+        "enabled": False,
+        "sampleRate": 0.05,
+        "slowThreshold": 2.0,
+        "captureFolder": "./logs/slowPages/"
+        }
+
+# For each profile, and each stage (the name of the profiled function) in that profile, the number of calls and the CPU and wall time spent
+stageTimings = {}
+# The cProfile stats collected for each profile
+profileStats = {}
+statsLock = threading.Lock()
+# Held while a function is run with cProfile, as only one profiler can be active in the process at a time (starting another raises a ValueError from Python 3.12)
+cProfileLock = threading.Lock()
+
+# Holds the name of the profile currently being processed, and how deep in profiled functions the thread currently is
+threadState = threading.local()
+
+# Enable profiling of the functions in the hot path. sampleRate is the share of the calls that will be profiled with cProfile, and pages where a profiled function takes more than slowThreshold seconds will be saved to captureFolder
+def enableProfiling(sampleRate=0.05, slowThreshold=2.0, captureFolder="./logs/slowPages/"):
+    profilingSettings.update({"enabled": True, "sampleRate": sampleRate, "slowThreshold": slowThreshold, "captureFolder": captureFolder})
+
+def disableProfiling():
+    profilingSettings["enabled"] = False
+
+def resetProfiling():
+    with statsLock:
+        stageTimings.clear()
+        profileStats.clear()
+
+# Used for setting the profile that the calls in the current thread should be counted for, for functions that doesn't take the profile as an argument
+def setCurrentProfile(profileName):
+    threadState.profileName = profileName
+
+def getCurrentProfile():
+    return getattr(threadState, "profileName", "unknown")
+
+# Function for saving the source of a page that was slow to process, along with the profile and how long it took, so it can be investigated later
+def captureSlowPage(profileName, stageName, pageSource, wallTime):
+    captureFolder = Path(profilingSettings["captureFolder"]) / fileSafeString(profileName)
+    os.makedirs(captureFolder, mode=0o750, exist_ok=True)
+
+    captureName = "{}-{}-{}".format(time.strftime("%Y%m%d%H%M%S"), stageName, time.time_ns())
+    with open(captureFolder / (captureName + ".html"), "w") as captureFile:
+        captureFile.write(str(pageSource))
+    with open(captureFolder / (captureName + ".json"), "w") as detailsFile:
+        json.dump({"profile": profileName, "stage": stageName, "seconds": wallTime}, detailsFile)
+
+# Decorator for the functions that should be profiled. pageArgument is the position of the argument holding the page (either the source or a soup) that will be captured if the call is slow, and profileArgument is the position of the argument holding the profile (as a parsed profile) if the function takes it
+def profiled(stageName, pageArgument=None, profileArgument=None):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profilingSettings["enabled"]:
+                return function(*args, **kwargs)
+
+            previousProfile = getattr(threadState, "profileName", None)
+            if profileArgument != None and len(args) > profileArgument:
+                setCurrentProfile(args[profileArgument]['source']['profileName'])
+            profileName = getCurrentProfile()
+
+            # Only the outermost of the profiled functions can be run with cProfile, and only if no other thread is running one at the moment, as only one profiler can be active at a time. Otherwise only the timings are recorded
+            depth = getattr(threadState, "depth", 0)
+            profiler = None
+            if depth == 0 and random.random() < profilingSettings["sampleRate"] and cProfileLock.acquire(blocking=False):
+                import cProfile
+                profiler = cProfile.Profile()
+
+            threadState.depth = depth + 1
+            startWall = time.perf_counter()
+            startCPU = time.thread_time()
+            try:
+                if profiler != None:
+                    try:
+                        result = profiler.runcall(function, *args, **kwargs)
+                    finally:
+                        cProfileLock.release()
+                else:
+                    result = function(*args, **kwargs)
+            finally:
+                CPUTime = time.thread_time() - startCPU
+                wallTime = time.perf_counter() - startWall
+                threadState.depth = depth
+                if profileArgument != None:
+                    threadState.profileName = previousProfile
+
+            with statsLock:
+                timings = stageTimings.setdefault(profileName, {}).setdefault(stageName, {"calls": 0, "CPUTime": 0.0, "wallTime": 0.0})
+                timings["calls"] += 1
+                timings["CPUTime"] += CPUTime
+                timings["wallTime"] += wallTime
+
+                if profiler != None:
+                    if profileName in profileStats:
+                        profileStats[profileName].add(profiler)
+                    else:
+                        import pstats
+                        profileStats[profileName] = pstats.Stats(profiler)
+
+            # Slow pages are only captured by the outermost function, so the same page isn't saved multiple times
+            if depth == 0 and wallTime > profilingSettings["slowThreshold"] and pageArgument != None and len(args) > pageArgument:
+                captureSlowPage(profileName, stageName, args[pageArgument], wallTime)
+
+            return result
+        return wrapper
+    return decorator
+
+# Function for creating a report of the profiles ranked by how much CPU time was spent on them. Returns a list of dictionaries with the profile, the total CPU and wall time, number of pages and the CPU time per page, along with the timings for each stage
+def profilingReport():
+    report = []
+    with statsLock:
+        for profileName, stages in stageTimings.items():
+            # The pages are counted by the outermost functions, which are the ones that gets the page
+            pageCount = max([stages[stage]["calls"] for stage in ["extractAllDetails", "extractMetaInformation"] if stage in stages] + [0])
+            # Only the stages that aren't called by other profiled stages are counted for the total, to avoid counting the time twice
+            totalCPU = sum(stages[stage]["CPUTime"] for stage in stages if stage != "cleanSoup")
+            report.append({
+                "profile": profileName,
+                "CPUTime": totalCPU,
+                "wallTime": sum(stages[stage]["wallTime"] for stage in stages if stage != "cleanSoup"),
+                "pages": pageCount,
+                "CPUTimePerPage": totalCPU / pageCount if pageCount > 0 else None,
+                "stages": {stage: dict(timings) for stage, timings in stages.items()}
+                })
+
+    report.sort(key=lambda profile: profile["CPUTime"], reverse=True)
+    return report
+
+# Function for printing the report, and optionally writing the cProfile stats for each profile to statsFolder, so they can be inspected with pstats or tools like snakeviz
+def printProfilingReport(statsFolder=None, topFunctions=10):
+    for profile in profilingReport():
+        CPUTimePerPage = "{:.3f}s".format(profile["CPUTimePerPage"]) if profile["CPUTimePerPage"] != None else "-"
+        print("{}: {:.3f}s CPU over {} pages ({} per page)".format(profile["profile"], profile["CPUTime"], profile["pages"], CPUTimePerPage))
+        for stage, timings in profile["stages"].items():
+            print("    {}: {} calls, {:.3f}s CPU, {:.3f}s wall".format(stage, timings["calls"], timings["CPUTime"], timings["wallTime"]))
+
+    with statsLock:
+        for profileName, stats in profileStats.items():
+            if statsFolder != None:
+                os.makedirs(Path(statsFolder), exist_ok=True)
+                stats.dump_stats(Path(statsFolder) / (fileSafeString(profileName) + ".prof"))
+            else:
+                print("Sampled cProfile stats for " + profileName + ":")
+                stats.sort_stats("cumulative").print_stats(topFunctions)
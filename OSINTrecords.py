@@ -0,0 +1,82 @@
+# Compact records for the OG tags and articles, used instead of a dictionary for each article, as a dictionary takes up several times as much memory as a class with __slots__, which adds up when handling hundreds of thousands of articles at once. The records can still be read and written like dictionaries (record['title']), and asDict can be used where an actual dictionary is needed, like when converting to JSON
+
+class CompactRecord():
+    # The names of the fields in the record, in order. Subclasses should set both this and __slots__
+    fields = ()
+    # Alternative names that can be used for some of the fields when accessing them like a dictionary, with the alternative name as key and the field as value
+    keyAliases = {}
+    __slots__ = ()
+
+    # The fields can be given both in order and by name, and the ones not given will be None
+    def __init__(self, *args, **kwargs):
+        for field, value in zip(self.fields, args):
+            object.__setattr__(self, field, value)
+        for field in self.fields[len(args):]:
+            object.__setattr__(self, field, kwargs.pop(field, None))
+        if kwargs != {}:
+            raise TypeError("Unknown fields for {}: {}".format(type(self).__name__, ", ".join(kwargs)))
+
+    def __getitem__(self, key):
+        key = self.keyAliases.get(key, key)
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        key = self.keyAliases.get(key, key)
+        if key not in self.fields:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return self.keyAliases.get(key, key) in self.fields
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    # Returns the keys used when the record is converted to a dictionary, so dict(record) works too
+    def keys(self):
+        fieldNames = { field : alias for alias, field in self.keyAliases.items() }
+        return [ fieldNames.get(field, field) for field in self.fields ]
+
+    def asDict(self):
+        return { key : self[key] for key in self.keys() }
+
+    def __eq__(self, other):
+        return type(self) == type(other) and all(getattr(self, field) == getattr(other, field) for field in self.fields)
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, ", ".join("{}={!r}".format(field, getattr(self, field)) for field in self.fields))
+
+# The meta information extracted from a page by OSINTextract.extractMetaInformation. Can be accessed using the names of the OG tags as keys, like "og:title"
+class MetaInformation(CompactRecord):
+    fields = ("title", "description", "image", "author", "publishDate")
+    keyAliases = {"og:title": "title", "og:description": "description", "og:image": "image"}
+    __slots__ = fields
+
+# The OG tags collected for an article, as created by OSINTtags.collectOGTagsFromNewsSite and written to the DB by OSINTdatabase.writeOGTagsToDB
+class OGTagRecord(CompactRecord):
+    fields = ("profile", "url", "title", "description", "image", "author", "publishDate")
+    __slots__ = fields
+
+# An article as read from the DB for the feed, with the fields named after the collumns in the DB
+class ArticleRecord(CompactRecord):
+    fields = ("id", "title", "description", "url", "image_url", "author", "publish_date", "profile")
+    __slots__ = fields
+
+# An article found by full text search, along with how well it matched the search
+class SearchResultRecord(ArticleRecord):
+    fields = ArticleRecord.fields + ("rank",)
+    __slots__ = ("rank",)
+
+# The result of scraping a single article, which can be returned by the scrapeArticle function given to OSINTpipeline.runScrapeCycle and streamBackfill, so the tags, the search vector and the content fingerprint of the article can be stored in the DB along with the file path
+class ScrapedArticleRecord(CompactRecord):
+    fields = ("filePath", "tags", "clearText")
+    __slots__ = fields
+
+# Function for converting a list of records to a list of dictionaries, for where the actual dictionaries are needed, like when returning the articles as JSON
+def recordsAsDicts(records):
+    return [ record.asDict() for record in records ]
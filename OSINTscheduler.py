@@ -0,0 +1,122 @@
+# Used for storing the state of the scheduler between runs
+import json
+
+import os
+import time
+import math
+
+# Used for handling relative paths
+from pathlib import Path
+
+from OSINTmodules.OSINTmisc import printDebug
+from OSINTmodules.OSINTscraping import defaultMaxURLs
+from OSINTmodules.OSINTdatabase import requestPublishRates
+
+# Class for deciding when each profile should be polled for new articles, and how many article URLs should be gathered when it is, based on how often the news site publishes new articles. Busy news sites will be polled often and quiet ones rarely, and if a news site has published more articles since the last poll than would normally be gathered, more will be gathered so none are missed
+class PollScheduler():
+    def __init__(self, statePath="./logs/pollSchedule.json", minInterval=10*60, maxInterval=6*60*60, targetArticlesPerPoll=5, maxURLs=100, rateRefreshInterval=60*60):
+        self.statePath = Path(statePath)
+        # The shortest and longest time between polls of a profile, in seconds
+        self.minInterval = minInterval
+        self.maxInterval = maxInterval
+        # How many new articles there should ideally be each time a profile is polled
+        self.targetArticlesPerPoll = targetArticlesPerPoll
+        # The highest number of URLs that will be gathered from a profile in one poll
+        self.maxURLs = maxURLs
+        # How many seconds the publish rates loaded from the DB is used, before they're loaded again
+        self.rateRefreshInterval = rateRefreshInterval
+
+        # The rate of articles published per hour for each profile, and when they were loaded
+        self.publishRates = {}
+        self.ratesUpdated = 0
+        # For each profile the time of the last poll and the number of URLs gathered and found to be new in that poll
+        self.state = {}
+
+        if self.statePath.exists():
+            with open(self.statePath, "r") as stateFile:
+                self.state = json.load(stateFile)
+
+    def save(self):
+        tempPath = self.statePath.with_suffix(".tmp")
+        with open(tempPath, "w") as stateFile:
+            json.dump(self.state, stateFile)
+        os.replace(tempPath, self.statePath)
+
+    # Load how many articles each of the profiles has published per hour lately from the DB
+    def updatePublishRates(self, connection, tableName, profileNames, days=14):
+        self.publishRates.update(requestPublishRates(connection, tableName, profileNames, days))
+        self.ratesUpdated = time.time()
+
+    # Load the publish rates from the DB again if they're older than rateRefreshInterval, or if any of the profiles is missing a rate. Should be called before dueProfiles, as every profile would otherwise be polled at maxInterval
+    def refreshPublishRates(self, connection, tableName, profileNames, days=14, currentTime=None):
+        if currentTime == None:
+            currentTime = time.time()
+
+        if currentTime - self.ratesUpdated >= self.rateRefreshInterval or any(profileName not in self.publishRates for profileName in profileNames):
+            self.updatePublishRates(connection, tableName, profileNames, days)
+
+    # The number of seconds to wait between polls of a profile, so that each poll will give around targetArticlesPerPoll new articles
+    def pollInterval(self, profileName):
+        hourlyRate = self.publishRates.get(profileName, 0)
+        if hourlyRate <= 0:
+            return self.maxInterval
+        return min(self.maxInterval, max(self.minInterval, self.targetArticlesPerPoll / hourlyRate * 3600))
+
+    # Returns true if it's time to poll the profile again
+    def isDue(self, profileName, currentTime=None):
+        if profileName not in self.state:
+            return True
+        if currentTime == None:
+            currentTime = time.time()
+
+        pollInterval = self.pollInterval(profileName)
+
+        # If every URL gathered last time was new, there might be even more waiting, so the profile is polled again as soon as possible
+        profileState = self.state[profileName]
+        if profileState['newCount'] >= profileState['gatheredCount'] > 0:
+            pollInterval = self.minInterval
+
+        return currentTime - profileState['lastPoll'] >= pollInterval
+
+    # The number of URLs that should be gathered from the profile when it's polled, which is raised above the default when more articles than that is expected to have been published since the last poll
+    def URLCap(self, profileName, currentTime=None):
+        if profileName not in self.state:
+            return defaultMaxURLs
+        if currentTime == None:
+            currentTime = time.time()
+
+        profileState = self.state[profileName]
+
+        # Expecting 50% more articles than the average, since articles are often published in bursts
+        expectedArticles = math.ceil(self.publishRates.get(profileName, 0) * (currentTime - profileState['lastPoll']) / 3600 * 1.5)
+        cap = max(defaultMaxURLs, expectedArticles)
+
+        # If all the URLs gathered last time was new, some were probably missed, so twice as many will be gathered this time
+        if profileState['newCount'] >= profileState['gatheredCount'] > 0:
+            cap = max(cap, profileState['gatheredCount'] * 2)
+
+        return min(cap, self.maxURLs)
+
+    # Takes in a list of profiles (as returned by OSINTprofiles.getProfiles) and returns the profiles that should be polled now, along with a dictionary with the number of URLs to gather from each, that can be given directly to OSINTscraping.gatherArticleURLs
+    def dueProfiles(self, profiles, currentTime=None):
+        if currentTime == None:
+            currentTime = time.time()
+
+        dueProfiles = []
+        maxURLs = {}
+        for profile in profiles:
+            profileName = json.loads(profile)['source']['profileName']
+            if self.isDue(profileName, currentTime):
+                dueProfiles.append(profile)
+                maxURLs[profileName] = self.URLCap(profileName, currentTime)
+
+        printDebug("{} of {} profiles are due for polling".format(len(dueProfiles), len(profiles)))
+
+        return dueProfiles, maxURLs
+
+    # Should be called after a profile has been polled, with the number of URLs that was gathered and how many of them was new
+    def recordPoll(self, profileName, gatheredCount, newCount, currentTime=None):
+        if currentTime == None:
+            currentTime = time.time()
+
+        self.state[profileName] = {'lastPoll': currentTime, 'gatheredCount': gatheredCount, 'newCount': newCount}
@@ -10,20 +10,7 @@ import itertools
 # The profiles mapping the different websites are in json format
 import json
 
-# Used to gather the urls from the articles, by reading a RSS feed
-import feedparser
-
-# Used for scraping static pages
-import requests
-
-# Used for dynamically scraping pages that aren't static
-from selenium import webdriver
-
-# Used for running the browser headlessly
-from selenium.webdriver.firefox.options import Options
-
-# For parsing html
-from bs4 import BeautifulSoup
+# Feedparser, requests, selenium and bs4 is imported in the functions using them instead of here, as they take a long time to import and aren't needed by everything using this module
 
 from OSINTmodules.OSINTmisc import catURL
 
@@ -65,6 +52,11 @@ browserHeadersList = [
 
 # Simple function for scraping static page and converting it to a soup
 def scrapeWebSoup(URL):
+    # Used for scraping static pages
+    import requests
+    # For parsing html
+    from bs4 import BeautifulSoup
+
     currentHeaders = random.choice(browserHeadersList)
     pageSource = requests.get(URL, headers=currentHeaders)
     if pageSource.status_code != 200:
@@ -72,8 +64,11 @@ def scrapeWebSoup(URL):
         return None
     return BeautifulSoup(pageSource.content, 'html.parser')
 
+# The number of article URLs gathered from each news site by default
+defaultMaxURLs = 10
+
 # Scraping targets is element and class of element in which the target url is stored, and the profileName is prepended on the list, to be able to find the profile again when it's needed for scraping
-def scrapeArticleURLs(rootURL, frontPageURL, scrapingTargets, profileName):
+def scrapeArticleURLs(rootURL, frontPageURL, scrapingTargets, profileName, maxURLs=defaultMaxURLs):
 
     # List for holding the urls for the articles
     articleURLs = [profileName]
@@ -83,35 +78,38 @@ def scrapeArticleURLs(rootURL, frontPageURL, scrapingTargets, profileName):
 
     # Some websites doesn't have a uniqe class for the links to the articles. If that's the case, we have to extract the elements around the link and the extract the link from those
     if scrapingTargets['linkClass'] == "":
-        # Looping through the first 10 of the elements that in the profile has been specified by element type and class to contain the links we want. Only first 10 due to same reason in RSSArticleURLs
-        for linkContainer in itertools.islice(frontPageSoup.find_all(scrapingTargets['element'], class_=scrapingTargets['class']), 10):
+        # Looping through the first [maxURLs] of the elements that in the profile has been specified by element type and class to contain the links we want. Only the first ones due to same reason in RSSArticleURLs
+        for linkContainer in itertools.islice(frontPageSoup.find_all(scrapingTargets['element'], class_=scrapingTargets['class']), maxURLs):
 
             # The URL specified in the source will ofc be without the domain and http information, so that get's prepended here too by removing the last / from the url since the path also contains one
             articleURLs.append(catURL(rootURL, linkContainer.find('a').get('href')))
 
     # Others do hovewer have a uniqe class for the links, and here we can just extract those
     else:
-        for link in itertools.islice(frontPageSoup.find_all('a', class_=scrapingTargets['linkClass']), 10):
+        for link in itertools.islice(frontPageSoup.find_all('a', class_=scrapingTargets['linkClass']), maxURLs):
             articleURLs.append(catURL(rootURL, link.get('href')))
 
     return articleURLs
 
 # Function for scraping a list of recent articles using the url to a RSS feed
-def RSSArticleURLs(RSSURL, profileName):
+def RSSArticleURLs(RSSURL, profileName, maxURLs=defaultMaxURLs):
+    # Used to gather the urls from the articles, by reading a RSS feed
+    import feedparser
+
     # Parse the whole RSS feed
     RSSFeed = feedparser.parse(RSSURL)
 
     # List for holding the urls from the RSS feed
     articleURLs = [profileName]
 
-    # Extracting the urls only, as these are the only relevant information. Also only take the first 10, if more is given to only get the newest articles
-    for entry in itertools.islice(RSSFeed.entries, 10):
+    # Extracting the urls only, as these are the only relevant information. Also only take the first [maxURLs], if more is given to only get the newest articles
+    for entry in itertools.islice(RSSFeed.entries, maxURLs):
         articleURLs.append(entry.id)
 
     return articleURLs
 
-# Function for gathering list of URLs for articles from newssite
-def gatherArticleURLs(profiles):
+# Function for gathering list of URLs for articles from newssite. maxURLs can be a dictionary with the name of the profiles as keys and the number of URLs to gather from each of them as value, to gather more or less than the default from some of them
+def gatherArticleURLs(profiles, maxURLs={}):
 
     articleURLs = list()
 
@@ -122,15 +120,19 @@ def gatherArticleURLs(profiles):
 
         # For those were the RSS feed is useful, that will be used
         if profile['retrivalMethod'] == "rss":
-            articleURLs.append(RSSArticleURLs(profile['newsPath'], profile['profileName']))
+            articleURLs.append(RSSArticleURLs(profile['newsPath'], profile['profileName'], maxURLs.get(profile['profileName'], defaultMaxURLs)))
 
         # For basically everything else scraping will be used
         elif profile['retrivalMethod'] == "scraping":
-            articleURLs.append(scrapeArticleURLs(profile['address'], profile['newsPath'], profile['scrapingTargets'], profile['profileName']))
+            articleURLs.append(scrapeArticleURLs(profile['address'], profile['newsPath'], profile['scrapingTargets'], profile['profileName'], maxURLs.get(profile['profileName'], defaultMaxURLs)))
 
     return articleURLs
 
 def scrapePageDynamic(pageURL, loadTime=3, headless=True):
+    # Used for dynamically scraping pages that aren't static
+    from selenium import webdriver
+    # Used for running the browser headlessly
+    from selenium.webdriver.firefox.options import Options
 
     # Setting the options for running the browser driver headlessly so it doesn't pop up when running the script
     driverOptions = Options()
@@ -0,0 +1,131 @@
+# Used for finding the markdown files when indexing a folder of articles
+import os
+
+# Used for handling relative paths
+from pathlib import Path
+
+# Used for the ranking of the search results
+import math
+
+# Used for saving and loading the index to and from disk
+import pickle
+
+import re
+
+from collections import Counter
+
+# Used for reading both compressed and uncompressed articles
+from OSINTmodules.OSINTfiles import readArticleFile
+
+# Used for splitting text into words that can be indexed
+wordPattern = re.compile(r'[^\W_]+')
+
+# How much a word in each of the fields is weighted compared to a word in the text of the article, following the same order as the weights used in the full text search in the DB
+fieldWeights = {'title': 4, 'tags': 2, 'description': 2, 'text': 1}
+
+def tokenize(text):
+    return wordPattern.findall(text.lower())
+
+# Pure python inverted index for searching articles when there's no access to the DB. Articles are stored with a key (like the ID of the article or the path to the markdown file), and the index maps each word to the keys of the articles containing it along with how many (weighted) times the word occurs
+class SearchIndex():
+    def __init__(self):
+        self.postings = {}
+        self.documentLengths = {}
+        # The words in each article, so the article can be removed from the index without going through every word
+        self.documentWords = {}
+
+    # Add an article to the index, or re-index it if it already exists
+    def addArticle(self, key, title="", description="", text="", tags=[]):
+        if key in self.documentLengths:
+            self.removeArticle(key)
+
+        wordCounts = Counter()
+        for field, content in [('title', title), ('description', description), ('text', text), ('tags', " ".join(tags))]:
+            for word in tokenize(content or ""):
+                wordCounts[word] += fieldWeights[field]
+
+        for word, count in wordCounts.items():
+            self.postings.setdefault(word, {})[key] = count
+
+        self.documentLengths[key] = sum(wordCounts.values())
+        self.documentWords[key] = list(wordCounts)
+
+    def removeArticle(self, key):
+        if key not in self.documentLengths:
+            return
+
+        for word in self.documentWords.pop(key):
+            del self.postings[word][key]
+            if self.postings[word] == {}:
+                del self.postings[word]
+
+        del self.documentLengths[key]
+
+    # Search for articles containing all the words in searchQuery, and return a list of [key, score] for the best matches first, ranked using BM25. Use limit and offset for pagination
+    def search(self, searchQuery, limit=20, offset=0):
+        queryWords = set(tokenize(searchQuery))
+
+        if queryWords == set() or any(word not in self.postings for word in queryWords):
+            return []
+
+        # Start with the rarest word, so the set of matching articles is as small as possible from the start
+        sortedWords = sorted(queryWords, key=lambda word: len(self.postings[word]))
+        matches = set(self.postings[sortedWords[0]])
+        for word in sortedWords[1:]:
+            matches.intersection_update(self.postings[word])
+
+        documentCount = len(self.documentLengths)
+        averageLength = sum(self.documentLengths.values()) / documentCount
+
+        scores = []
+        for key in matches:
+            score = 0
+            for word in queryWords:
+                frequency = self.postings[word][key]
+                inverseFrequency = math.log(1 + (documentCount - len(self.postings[word]) + 0.5) / (len(self.postings[word]) + 0.5))
+                score += inverseFrequency * frequency * 2.2 / (frequency + 1.2 * (0.25 + 0.75 * self.documentLengths[key] / averageLength))
+            scores.append([key, score])
+
+        scores.sort(key=lambda result: result[1], reverse=True)
+
+        return scores[offset:offset + limit]
+
+    def save(self, indexPath):
+        with open(Path(indexPath), "wb") as indexFile:
+            pickle.dump({'postings': self.postings, 'documentLengths': self.documentLengths, 'documentWords': self.documentWords}, indexFile)
+
+    def __len__(self):
+        return len(self.documentLengths)
+
+def loadSearchIndex(indexPath):
+    searchIndex = SearchIndex()
+    with open(Path(indexPath), "rb") as indexFile:
+        indexContent = pickle.load(indexFile)
+    searchIndex.postings = indexContent['postings']
+    searchIndex.documentLengths = indexContent['documentLengths']
+    searchIndex.documentWords = indexContent['documentWords']
+    return searchIndex
+
+# Function for indexing all the markdown files in the folder holding the articles, using the path relative to that folder (the same as the file path stored in the DB for content addressed articles) as key. The first line of each file is used as the title, and the [[tags]] as tags
+def indexArticleFolder(articleRoot="./articles/", searchIndex=None):
+    if searchIndex == None:
+        searchIndex = SearchIndex()
+
+    for folder, subFolders, files in os.walk(articleRoot):
+        # The bodies stored in the objects folder is read through the header files referring to them, so they aren't indexed on their own
+        if os.path.normpath(folder) == os.path.normpath(articleRoot) and "objects" in subFolders:
+            subFolders.remove("objects")
+
+        for fileName in files:
+            if not (fileName.endswith(".md") or fileName.endswith(".md.gz")):
+                continue
+
+            relativePath = os.path.relpath(os.path.join(folder, fileName), articleRoot).replace(os.sep, "/")
+            articleText = readArticleFile(relativePath, articleRoot)
+
+            title = articleText.strip().split("\n")[0].lstrip("# ")
+            tags = re.findall(r'\[\[(.*?)\]\]', articleText)
+
+            searchIndex.addArticle(relativePath, title=title, text=articleText, tags=tags)
+
+    return searchIndex
@@ -16,6 +16,12 @@ from OSINTmodules.OSINTscraping import scrapeWebSoup
 # Used for scraping the needed OG tags
 from OSINTmodules.OSINTextract import extractMetaInformation
 
+# The OG tags for each article is stored as a compact record instead of a dictionary
+from OSINTmodules.OSINTrecords import OGTagRecord
+
+# Used for noting which profile is being processed, when profiling is enabled
+from OSINTmodules.OSINTprofiling import setCurrentProfile
+
 
 
 # Function for collecting OG tags from a list of lists with the URLs for different news sites, with the first element in each of the lists in the list being the name of the profile. Will run in parallel
@@ -56,6 +62,8 @@ def collectOGTagsFromNewsSite(profileName, URLList):
     OGTagCollection = {}
     OGTagCollection[profileName] = []
 
+    setCurrentProfile(profileName)
+
     # Looping through each URL for the articles, scraping the OG tags for those articles and then adding them to the final data structure
     for URL in URLList:
         pageSoup = scrapeWebSoup(URL)
@@ -63,14 +71,14 @@ def collectOGTagsFromNewsSite(profileName, URLList):
         if pageSoup != None:
             OGTags = extractMetaInformation(pageSoup)
 
-            OGTagCollection[profileName].append({
-                'profile'       : profileName,
-                'url'           : URL,
-                'title'         : re.sub(r'"', '', OGTags['og:title']),
-                'description'   : re.sub(r'"', '', OGTags['og:description']),
-                'image'         : OGTags['og:image'],
-                'author'        : OGTags['author'],
-                'publishDate'   : OGTags['publishDate']
-            })
+            OGTagCollection[profileName].append(OGTagRecord(
+                profile     = profileName,
+                url         = URL,
+                title       = re.sub(r'"', '', OGTags.title),
+                description = re.sub(r'"', '', OGTags.description),
+                image       = OGTags.image,
+                author      = OGTags.author,
+                publishDate = OGTags.publishDate
+            ))
 
     return OGTagCollection
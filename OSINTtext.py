@@ -7,39 +7,55 @@ import unicodedata
 # For counting and finding the most frequently used words when generating tag
 from collections import Counter
 
+# Used for hashing the words when fingerprinting text
+import hashlib
+
+# Used for optionally profiling the tag generation
+from OSINTmodules.OSINTprofiling import profiled
+
+# The number of bits in the fingerprints, and the number of bands they're split into when indexing. Fingerprints that differ in fewer bits than there are bands is guaranteed to share at least one band, and will therefore always be found by the index
+fingerprintBits = 64
+fingerprintBands = 8
+# Used for finding the words in a text when fingerprinting it
+fingerprintWordPattern = re.compile(r'[^\W_]+')
+
+
+# Pattern matching the words used for text analysis in one pass: each word is what comes before any apostrophe (removing contractions and the "'s" created in english by descriping possession) in a run of non-whitespace characthers, and only words with at least one letter in them is matched, which leaves out "-", "3432" and the like
+tokenPattern = re.compile(r'(?<!\S)[^\s\'a-zA-Z]*[a-zA-Z][^\s\']*')
+
+# Function for taking in text from article (or basically any source) and lazily yielding the words cleaned for punctuation, sole numbers, double spaces and other things, so that it can be used for text analyssis without building a list
+def iterateTokens(clearText):
+    # Normalizing the text, to remove weird characthers that sometimes pop up in webarticles. Most text is already normalized, in which case the copy is skipped
+    if not unicodedata.is_normalized("NFKD", clearText):
+        clearText = unicodedata.normalize("NFKD", clearText)
+
+    return map(re.Match.group, tokenPattern.finditer(clearText))
 
 # Function for taking in text from article (or basically any source) and outputting a list of words cleaned for punctuation, sole numbers, double spaces and other things so that it can be used for text analyssis
 def cleanText(clearText):
-    # Normalizing the text, to remove weird characthers that sometimes pop up in webarticles
-    cleanClearText = unicodedata.normalize("NFKD", clearText)
-    # Remove line endings
-    cleanClearText = re.sub(r'\n', ' ', cleanClearText)
-    # Removing all contractions and "'s" created in english by descriping possession
-    cleanClearText = re.sub(r'\'\S*', '', cleanClearText)
-    # Remove all "words" where the word doesn't have any letters in it. This will remove "-", "3432" (words consisting purely of letters) and double spaces.
-    cleanClearText = re.sub(r'\s[^a-zA-Z]*\s', ' ', cleanClearText)
+    return list(iterateTokens(clearText))
 
-    # Converting the cleaned cleartext to a list
-    clearTextList = cleanClearText.split(" ")
+# The wordlists that has been read, with the path as key, so they're only read from disk once
+wordlistCache = {}
 
-    return clearTextList
+def loadWordlist(wordlistPath="./tools/wordlist.txt"):
+    if wordlistPath not in wordlistCache:
+        with open(wordlistPath, "r") as wordlistFile:
+            wordlistCache[wordlistPath] = frozenset(line.strip() for line in wordlistFile)
+    return wordlistCache[wordlistPath]
 
-# Function for taking in a list of words, and generating tags based on that. Does this by finding the words that doesn't appear in a wordlist (which means they probably have some technical relevans) and then sort them by how often they're used. The input should be cleaned with cleanText
+# Function for taking in a list of words, and generating tags based on that. Does this by finding the words that doesn't appear in a wordlist (which means they probably have some technical relevans) and then sort them by how often they're used. The input should be cleaned with cleanText, or be the iterator from iterateTokens
+@profiled("generateTags")
 def generateTags(clearTextList):
 
-    # List containing words that doesn't exist in the wordlist
-    uncommonWords = list()
-
-    # Generating set of all words in the wordlist
-    wordlist = set(line.strip() for line in open("./tools/wordlist.txt", "r"))
+    # Getting the set of all words in the wordlist, which is only read from disk the first time
+    wordlist = loadWordlist()
 
     # Find all the words that doesn't exist in the normal english dictionary (since those are the names and special words that we want to use as tags)
-    for word in clearTextList:
-        if word.lower() not in wordlist and word != "":
-            uncommonWords.append(word)
+    uncommonWords = Counter(word for word in clearTextList if word != "" and word.lower() not in wordlist)
 
     # Take the newly found words, sort by them by frequency and take the 10 most used
-    sortedByFreq = [word for word in Counter(uncommonWords).most_common(10)]
+    sortedByFreq = [word for word in uncommonWords.most_common(10)]
 
     # only use those who have 3 mentions or more
     tagList = list()
@@ -48,3 +64,72 @@ def generateTags(clearTextList):
             tagList.append(wordCount[0])
 
     return tagList
+
+
+# Function for creating a 64 bit SimHash fingerprint of a text, which will only differ in a few bits for texts that are nearly the same, like the same wire story published by different news sites. The fingerprint is returned as a signed integer, so it can be stored in a BIGINT collumn in the DB
+def simHash(text):
+    # Using the lowercased words without any punctuation as features
+    features = Counter(fingerprintWordPattern.findall(text.lower()))
+
+    bitWeights = [0] * fingerprintBits
+    for feature, count in features.items():
+        featureHash = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(fingerprintBits):
+            if featureHash & (1 << bit):
+                bitWeights[bit] += count
+            else:
+                bitWeights[bit] -= count
+
+    fingerprint = 0
+    for bit in range(fingerprintBits):
+        if bitWeights[bit] > 0:
+            fingerprint |= 1 << bit
+
+    # Converting to signed 64 bit integer
+    if fingerprint >= 1 << (fingerprintBits - 1):
+        fingerprint -= 1 << fingerprintBits
+
+    return fingerprint
+
+# Function for counting the number of bits two fingerprints differ in
+def hammingDistance(firstFingerprint, secondFingerprint):
+    return bin((firstFingerprint ^ secondFingerprint) & ((1 << fingerprintBits) - 1)).count("1")
+
+# Class for indexing fingerprints created with simHash, so near duplicates can be found without comparing to every single stored fingerprint. The fingerprints are split into bands, and only fingerprints sharing at least one band with the one being looked up are compared
+class FingerprintIndex():
+    # maxDistance has to be lower than the number of bands, as near duplicates could otherwise differ in every band and be missed
+    def __init__(self, maxDistance=5):
+        if maxDistance >= fingerprintBands:
+            raise Exception("The max distance for the fingerprint index has to be lower than the {} bands, but was {}".format(fingerprintBands, maxDistance))
+        self.maxDistance = maxDistance
+        self.bandWidth = fingerprintBits // fingerprintBands
+        self.bands = [dict() for i in range(fingerprintBands)]
+        self.fingerprints = {}
+
+    def splitIntoBands(self, fingerprint):
+        unsignedFingerprint = fingerprint & ((1 << fingerprintBits) - 1)
+        return [(unsignedFingerprint >> (band * self.bandWidth)) & ((1 << self.bandWidth) - 1) for band in range(fingerprintBands)]
+
+    # Add the fingerprint for [key] (normally the ID of the article in the DB) to the index
+    def add(self, key, fingerprint):
+        self.fingerprints[key] = fingerprint
+        for band, bandValue in enumerate(self.splitIntoBands(fingerprint)):
+            self.bands[band].setdefault(bandValue, set()).add(key)
+
+    # Will return the key of the closest stored fingerprint that differs in at most maxDistance bits from the given one, or None if there isn't any
+    def findNearDuplicate(self, fingerprint):
+        candidates = set()
+        for band, bandValue in enumerate(self.splitIntoBands(fingerprint)):
+            candidates.update(self.bands[band].get(bandValue, ()))
+
+        closestKey = None
+        closestDistance = self.maxDistance + 1
+        for key in candidates:
+            distance = hammingDistance(fingerprint, self.fingerprints[key])
+            if distance < closestDistance:
+                closestKey, closestDistance = key, distance
+
+        return closestKey
+
+    def __len__(self):
+        return len(self.fingerprints)
@@ -1,8 +1,15 @@
-import argon2
 import secrets
 from OSINTmodules.OSINTdatabase import returnArticleFilePathById
 
-ph = argon2.PasswordHasher()
+# The password hasher is created the first time it's needed, as argon2 is slow to import and isn't needed for most of what the front end does
+passwordHasher = None
+
+def getPasswordHasher():
+    global passwordHasher
+    if passwordHasher == None:
+        import argon2
+        passwordHasher = argon2.PasswordHasher()
+    return passwordHasher
 
 class User():
     def __init__(self, DBConnection, userTableName, username):
@@ -39,13 +46,16 @@ class User():
 
     def changePassword(self, password):
         if self.checkIfUserExists():
-            self.setPasswordHash(ph.hash(password))
+            self.setPasswordHash(getPasswordHasher().hash(password))
 
     # Will verify that clear text [password] matches the one for the current user
     def verifyPassword(self, password):
         if not self.checkIfUserExists():
             return False
         else:
+            from argon2.exceptions import VerifyMismatchError
+
+            ph = getPasswordHasher()
             userHash = self.getPasswordHash()
 
             try:
@@ -55,7 +65,7 @@ class User():
                     self.setPasswordHash(ph.hash(password))
                 return True
 
-            except argon2.exceptions.VerifyMismatchError:
+            except VerifyMismatchError:
                 return False
 
     def getMarkedArticles(self):
@@ -125,6 +135,6 @@ def createUser(connection, userTableName, username, password):
                 if cur.fetchall()[0][0] == False:
                     break
 
-            cur.execute("INSERT INTO {} (username, password_hash, id) VALUES (%s, %s, %s);".format(userTableName), (username, ph.hash(password), userID))
+            cur.execute("INSERT INTO {} (username, password_hash, id) VALUES (%s, %s, %s);".format(userTableName), (username, getPasswordHasher().hash(password), userID))
         connection.commit()
         return True
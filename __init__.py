@@ -1,4 +1,20 @@
-from os.path import dirname, basename, isfile, join
-import glob
-modules = glob.glob(join(dirname(__file__), "*.py"))
-__all__ = [ basename(f)[:-3] for f in modules if isfile(f) and not f.endswith('__init__.py')]
+# The modules are listed by hand instead of globbing the directory, so importing the package is as cheap as possible. None of the modules are imported here, so only the ones actually used will be loaded
+__all__ = [
+        "OSINTasyncdatabase",
+        "OSINTcache",
+        "OSINTdatabase",
+        "OSINTextract",
+        "OSINTfiles",
+        "OSINTmisc",
+        "OSINTpipeline",
+        "OSINTprofiles",
+        "OSINTprofiling",
+        "OSINTrecords",
+        "OSINTscheduler",
+        "OSINTscraping",
+        "OSINTsearch",
+        "OSINTtags",
+        "OSINTtext",
+        "OSINTuser",
+        "OSINTwebserver"
+        ]
@@ -0,0 +1,12 @@
+# The modules import each other as "OSINTmodules.<module>", so the repository folder is registered as the OSINTmodules package when running the tests from a checkout with a different folder name
+import sys
+import importlib.util
+from pathlib import Path
+
+repositoryPath = Path(__file__).resolve().parent.parent
+
+if "OSINTmodules" not in sys.modules:
+    packageSpec = importlib.util.spec_from_file_location("OSINTmodules", repositoryPath / "__init__.py", submodule_search_locations=[str(repositoryPath)])
+    package = importlib.util.module_from_spec(packageSpec)
+    sys.modules["OSINTmodules"] = package
+    packageSpec.loader.exec_module(package)
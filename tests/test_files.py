@@ -0,0 +1,89 @@
+# Tests for the storing and reading of the article files in OSINTfiles
+import os
+
+import pytest
+
+from OSINTmodules.OSINTfiles import createMDFile, readArticleFile, MDFileWriter
+from OSINTmodules.OSINTcache import readArticleCached
+
+templateText = "# ${title}\n${subtitle}\n${information}\n${articleContent}\n${tags}\n"
+
+articleBody = "<p>The same wire story, published by several news sites.</p>"
+
+@pytest.fixture
+def articleRoot(tmp_path, monkeypatch):
+    pytest.importorskip("markdownify")
+    # createMDFile reads the template relative to the working directory
+    os.makedirs(tmp_path / "tools")
+    (tmp_path / "tools" / "markdownTemplate.md").write_text(templateText)
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "articles") + "/"
+
+def storeArticle(articleRoot, sourceName, URL, title, **kwargs):
+    return createMDFile(sourceName, URL, [title, "Unknown", "2021-01-01", "Unknown"], articleBody, ["wire"], articleRoot=articleRoot, **kwargs)
+
+def test_syndicated_bodies_are_shared(articleRoot):
+    firstPath = storeArticle(articleRoot, "Site A", "https://a.example/story", "Story at A")
+    secondPath = storeArticle(articleRoot, "Site B", "https://b.example/story", "Story at B")
+
+    assert firstPath != secondPath
+    assert len(os.listdir(articleRoot + "objects")) == 1
+
+    firstArticle = readArticleFile(firstPath, articleRoot)
+    secondArticle = readArticleFile(secondPath, articleRoot)
+    assert "The same wire story" in firstArticle and "The same wire story" in secondArticle
+    assert "Site A" in firstArticle and "Site B" not in firstArticle
+    assert "Site B" in secondArticle and "Story at A" not in secondArticle
+
+def test_compressed_and_background_writes(articleRoot):
+    with MDFileWriter() as writer:
+        filePath = storeArticle(articleRoot, "Site A", "https://a.example/story", "Story at A", writer=writer, compress=True).result()
+
+    assert "The same wire story" in readArticleFile(filePath, articleRoot)
+    assert readArticleCached(filePath, articleRoot) == readArticleFile(filePath, articleRoot)
+
+def test_paths_without_extension(articleRoot):
+    # The folder for the profile is normally created by OSINTmisc.createNewsSiteFolder
+    os.makedirs(articleRoot + "prof")
+    fileName = createMDFile("Site A", "https://a.example/story", ["Story at A", "Unknown", "2021-01-01", "Unknown"], articleBody, ["wire"], articleRoot + "prof/")
+    assert not fileName.endswith(".md")
+
+    assert "Story at A" in readArticleFile("prof/" + fileName, articleRoot)
+    assert "Story at A" in readArticleCached("prof/" + fileName, articleRoot)
+
+def test_rendered_articles_are_cached_by_renderer_name(articleRoot):
+    filePath = storeArticle(articleRoot, "Site A", "https://a.example/story", "Story at A")
+
+    assert readArticleCached(filePath, articleRoot, lambda text: "upper", "upper-v1") == "upper"
+    assert readArticleCached(filePath, articleRoot, lambda text: "lower", "lower-v1") == "lower"
+    assert readArticleCached(filePath, articleRoot, lambda text: "changed", "upper-v1") == "upper"
+
+    with pytest.raises(Exception):
+        readArticleCached(filePath, articleRoot, lambda text: text)
+
+def test_background_writes_are_batched(articleRoot, monkeypatch):
+    import threading
+    from OSINTmodules import OSINTfiles
+
+    syncedFolders = []
+    syncFolder = OSINTfiles.syncFolder
+    monkeypatch.setattr(OSINTfiles, "syncFolder", lambda folder: (syncedFolders.append(folder), syncFolder(folder)))
+
+    # Content for the template that blocks the writer until all the other articles are queued, so they're written as one batch
+    allQueued = threading.Event()
+    class BlockingContent(dict):
+        def __getitem__(self, key):
+            allQueued.wait()
+            return ""
+
+    os.makedirs(articleRoot + "prof")
+    with MDFileWriter() as writer:
+        blocker = writer.submit(BlockingContent(), articleRoot + "blocker.md")
+        futures = [writer.submit({'title': str(i), 'subtitle': "", 'information': "", 'articleContent': "text", 'tags': ""}, articleRoot + "prof/" + str(i) + ".md", i) for i in range(10)]
+        allQueued.set()
+
+    blocker.result()
+    assert [future.result() for future in futures] == list(range(10))
+    assert sorted(os.listdir(articleRoot + "prof")) == sorted(str(i) + ".md" for i in range(10))
+    # One sync for the blocking article, and one for the folder holding all the others
+    assert len(syncedFolders) == 2
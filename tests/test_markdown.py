@@ -0,0 +1,37 @@
+# Compares the markdown created directly from the parsed elements by OSINTfiles.elementsToMarkdown with the markdown created by markdownify from the serialized html, for the elements commonly found in news articles
+import pytest
+
+BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+markdownify = pytest.importorskip("markdownify").markdownify
+
+from OSINTmodules.OSINTfiles import elementsToMarkdown
+
+fixtureArticles = [
+    '<p>Plain paragraph of text.</p><p>And a second one.</p>',
+    '<p>Hello <a href="http://example.com/a_b">link here</a> and <strong>bold</strong> and <b>also bold</b></p>',
+    '<p><em>Emphasis</em> and <i>italic</i> text</p>',
+    '<p>snake_case names and 5*3 should be escaped</p>',
+    '<p>Run <code>python -m pip install a_b --x*</code> to exploit it</p>',
+    '<pre><code>def exploit_me(x):\n    return x * 2\n</code></pre>',
+    '<blockquote><p>First quoted paragraph.</p><p>Second quoted paragraph.</p></blockquote>',
+    '<h1>Title</h1><h2>Subtitle</h2><h3>Third level</h3><h4>Fourth level</h4>',
+    '<ul><li>one</li><li>two <b>bold</b></li></ul>',
+    '<ol><li>first</li><li>second</li></ol>',
+    '<p>A picture: <img src="image.png" alt="The picture"></p>',
+    '<p>Line one<br>Line two</p>',
+    '<figure><img src="photo.jpg" alt="Photo"><figcaption>The caption</figcaption></figure>',
+    '<p>Link with <a href="http://example.com" title="A title">title</a></p>',
+    '<p>Before rule</p><hr><p>After rule</p>',
+    '<table><tr><td>1</td><td>2</td></tr></table>',
+    '<p>Results:</p><table><thead><tr><th>Group</th><th>Victims</th></tr></thead><tbody><tr><td>LockBit</td><td><b>25</b></td></tr><tr><td>x_y</td><td>3</td></tr></tbody></table><p>After the table</p>',
+    '<ul><li>a<ul><li>b<ul><li>c</li></ul></li></ul></li><li>d</li></ul>',
+    '<ol><li>first<ol><li>nested</li></ol></li><li>second</li></ol>',
+    '<ol start="3"><li>third</li><li>fourth</li></ol>',
+    '<ul><li><p>First paragraph</p><p>Second paragraph</p></li><li>Other item</li></ul>',
+    '<ul>\n  <li>spaced</li>\n  <li>items</li>\n</ul><p>After the list</p>',
+]
+
+@pytest.mark.parametrize("articleHTML", fixtureArticles)
+def test_matches_markdownify(articleHTML):
+    elements = BeautifulSoup(articleHTML, "html.parser").contents
+    assert elementsToMarkdown(elements) == markdownify(articleHTML).strip("\n")